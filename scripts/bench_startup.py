@@ -0,0 +1,48 @@
+# Measure CLI startup: wall time of `python scripts/run_cli.py` (--help and a one-row offline run).
+# Batch jobs call the CLI thousands of times, so startup has a fixed budget; this
+# script exits non-zero when the median exceeds it.
+import argparse, os, statistics, subprocess, sys, tempfile, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(ROOT, "scripts", "run_cli.py")
+
+# Median wall time, in ms, for one offline single-row CLI run (interpreter startup included).
+STARTUP_BUDGET_MS = 250.0
+
+ROW = 'address,city,state,zip,price_usd,acres,lat,lon,cleared_hint\n"1 Test Rd","Lyons","NY","14489",100000,20,43.0585,-76.9783,"majority cleared"\n'
+
+def _time_once(cmd, env) -> float:
+    t0 = time.perf_counter()
+    subprocess.run(cmd, env=env, check=True, stdout=subprocess.DEVNULL)
+    return (time.perf_counter() - t0) * 1000.0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=10)
+    ap.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inp, out = os.path.join(tmp, "in.csv"), os.path.join(tmp, "out.csv")
+        with open(inp, "w") as f:
+            f.write(ROW)
+        env = dict(os.environ, SPN_CACHE_DIR=os.path.join(tmp, "cache"))
+        results = {
+            "python -c pass": [_time_once([sys.executable, "-c", "pass"], env) for _ in range(args.runs)],
+            "run_cli.py --help": [_time_once([sys.executable, CLI, "--help"], env) for _ in range(args.runs)],
+            "import pipeline": [_time_once([sys.executable, "-c", "import spn_screener.pipeline"], dict(env, PYTHONPATH=ROOT))
+                                for _ in range(args.runs)],
+            "run_cli.py 1 row offline": [_time_once([sys.executable, CLI, "--in", inp, "--out", out, "--skip-remote"], env)
+                                         for _ in range(args.runs)],
+        }
+
+    worst = 0.0
+    for name, ts in results.items():
+        med = statistics.median(ts)
+        worst = max(worst, med)
+        print(f"{name:<26} median {med:7.1f} ms   min {min(ts):7.1f} ms")
+    print(f"budget {args.budget_ms:.0f} ms -> {'OK' if worst <= args.budget_ms else 'OVER BUDGET'}")
+    sys.exit(0 if worst <= args.budget_ms else 1)
+
+if __name__ == "__main__":
+    main()
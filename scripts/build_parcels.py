@@ -0,0 +1,24 @@
+# Build the memory-mapped parcel footprint store from county tax-parcel exports.
+#   python scripts/build_parcels.py --out data/parcels.bin wayne.geojson ontario.shp ...
+# GeoJSON must be lon/lat; other formats are read (and reprojected) with geopandas.
+import argparse, os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("sources", nargs="+", help="County parcel files (GeoJSON, shapefile, GPKG, ...)")
+    ap.add_argument("--out", required=True, help="Output store path (use as SPN_PARCEL_STORE)")
+    ap.add_argument("--simplify-m", type=float, default=1.0, help="Simplification tolerance in meters")
+    ap.add_argument("--cell-deg", type=float, default=0.01, help="Spatial index cell size in degrees")
+    args = ap.parse_args()
+
+    from spn_screener.parcels import build_parcel_store
+
+    t0 = time.perf_counter()
+    n = build_parcel_store(args.sources, args.out, args.simplify_m, args.cell_deg)
+    size_mb = os.path.getsize(args.out) / 1e6
+    print(f"Wrote {n} parcels to {args.out} ({size_mb:.1f} MB) in {time.perf_counter() - t0:.1f}s")
+
+if __name__ == "__main__":
+    main()
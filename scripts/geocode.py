@@ -0,0 +1,47 @@
+# Batch geocoding for address-only listing sheets.
+#   Build the local index once from a NY address-point export (e.g. NYS Street Address Mapping):
+#     python scripts/geocode.py build-index --points sam.csv --index data/ny_addresses.sqlite \
+#         --street-col AddressNumber --street-col CompleteStreetName --city-col PlaceName --zip-col ZipCode \
+#         --lat-col Latitude --lon-col Longitude
+#   Then geocode listings (cache -> index -> online fallback):
+#     SPN_ADDRESS_INDEX=data/ny_addresses.sqlite python scripts/geocode.py geocode --in raw.csv --out geocoded.csv
+import argparse, os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("cmd", choices=["build-index", "geocode"])
+    ap.add_argument("--points", help="build-index: address-point CSV")
+    ap.add_argument("--index", help="Address index SQLite path (default: SPN_ADDRESS_INDEX)")
+    ap.add_argument("--street-col", action="append", help="build-index: street column(s), joined in order")
+    ap.add_argument("--city-col", default="city")
+    ap.add_argument("--zip-col", default="zip")
+    ap.add_argument("--lat-col", default="lat")
+    ap.add_argument("--lon-col", default="lon")
+    ap.add_argument("--in", dest="inp", help="geocode: listings CSV")
+    ap.add_argument("--out", dest="out", help="geocode: output CSV with lat/lon filled")
+    ap.add_argument("--geocoder", default=None, help="geocode: online fallback (census, or 'none')")
+    args = ap.parse_args()
+
+    from spn_screener.config import load_settings
+    from spn_screener import geocode
+
+    t0 = time.perf_counter()
+    if args.cmd == "build-index":
+        n = geocode.build_address_index(args.points, args.index, args.street_col or ["address"],
+                                        args.city_col, args.zip_col, args.lat_col, args.lon_col)
+        print(f"Indexed {n} address keys into {args.index} in {time.perf_counter() - t0:.1f}s")
+        return
+
+    overrides = {}
+    if args.index:
+        overrides["address_index"] = args.index
+    if args.geocoder is not None:
+        overrides["geocoder"] = "" if args.geocoder == "none" else args.geocoder
+    counts = geocode.geocode_file(args.inp, args.out, load_settings(**overrides))
+    summary = ", ".join(f"{k}={v}" for k, v in sorted(counts.items())) or "nothing to geocode"
+    print(f"Wrote {args.out} ({summary}) in {time.perf_counter() - t0:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,23 @@
-import argparse, os, json
-from spn_screener.pipeline import run_pipeline
+import argparse, os, sys
+
+# Make `python scripts/run_cli.py` work from a checkout without installing the package.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--in", dest="inp", required=True, help="Input CSV with listings")
     ap.add_argument("--out", dest="out", required=True, help="Output CSV")
     ap.add_argument("--geo", dest="geo", required=False, help="(optional) Output GeoJSON – not implemented in v0.1")
+    ap.add_argument("--skip-remote", action="store_true", help="Skip online GIS lookups (same as SPN_SKIP_REMOTE=1)")
     args = ap.parse_args()
-    os.makedirs(os.path.dirname(args.out), exist_ok=True)
-    run_pipeline(args.inp, args.out)
+
+    # Imported after argument parsing so `--help` and bad invocations return immediately.
+    from spn_screener.config import load_settings
+    from spn_screener.pipeline import run_pipeline
+
+    settings = load_settings(skip_remote=True) if args.skip_remote else load_settings()
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    run_pipeline(args.inp, args.out, settings)
     print(f"Wrote {args.out}")
 
 if __name__ == "__main__":
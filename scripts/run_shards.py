@@ -0,0 +1,61 @@
+# Sharded batch runs. Single machine:
+#   python scripts/run_shards.py all --in big.csv --out out/sites.csv --work work/ --shards 16 --workers 8
+# Several machines sharing work/ (and SPN_CACHE_DIR) on a network filesystem:
+#   python scripts/run_shards.py plan  --in big.csv --work work/ --shards 64
+#   python scripts/run_shards.py run   --work work/ --node 0 --nodes 4     (one per machine)
+#   python scripts/run_shards.py merge --work work/ --out out/sites.csv
+import argparse, os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("cmd", choices=["plan", "run", "merge", "status", "all"])
+    ap.add_argument("--in", dest="inp", help="Input CSV with listings (plan/all)")
+    ap.add_argument("--out", dest="out", help="Merged output CSV (merge/all)")
+    ap.add_argument("--work", dest="work", required=True, help="Shared work directory for shards + manifest")
+    ap.add_argument("--shards", type=int, default=os.cpu_count() or 4)
+    ap.add_argument("--tile-deg", type=float, default=0.1, help="Spatial tile size in degrees")
+    ap.add_argument("--workers", type=int, default=None, help="Local worker processes (default: CPU count)")
+    ap.add_argument("--retries", type=int, default=2, help="Retries for failed shards")
+    ap.add_argument("--index", type=int, action="append", help="run: shard index (repeatable)")
+    ap.add_argument("--node", type=int, default=0, help="run: this node's number")
+    ap.add_argument("--nodes", type=int, default=1, help="run: total nodes; node k takes shards where index %% nodes == k")
+    ap.add_argument("--skip-remote", action="store_true", help="Skip online GIS lookups (same as SPN_SKIP_REMOTE=1)")
+    args = ap.parse_args()
+
+    from spn_screener.config import load_settings
+    from spn_screener import sharding
+
+    settings = load_settings(skip_remote=True) if args.skip_remote else load_settings()
+
+    if args.cmd == "plan":
+        m = sharding.plan_shards(args.inp, args.work, args.shards, args.tile_deg)
+        print(f"Planned {len(m['shards'])} shards for {m['n_rows']} rows in {args.work}")
+    elif args.cmd == "run":
+        status = sharding.shard_status(args.work)
+        todo = args.index or [i for i in status["pending"] + status["failed"] if i % args.nodes == args.node]
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = {i: pool.submit(sharding.run_shard, args.work, i, settings) for i in sorted(todo)}
+            for i, fut in futures.items():
+                try:
+                    print(f"shard {i}: {fut.result()} rows")
+                except Exception as e:
+                    print(f"shard {i}: FAILED ({e})")
+    elif args.cmd == "merge":
+        n = sharding.merge_shards(args.work, args.out)
+        print(f"Wrote {n} rows to {args.out}")
+    elif args.cmd == "status":
+        for k, v in sharding.shard_status(args.work).items():
+            print(f"{k:8} {len(v):5d}  {v[:20]}{' …' if len(v) > 20 else ''}")
+    else:
+        status = sharding.run_sharded(args.inp, args.out, args.work, args.shards, args.workers,
+                                      args.retries, args.tile_deg, settings)
+        if status["failed"] or status["pending"]:
+            print(f"Shards still failing after retries: {status['failed'] + status['pending']}")
+            sys.exit(1)
+        print(f"Wrote {args.out}")
+
+if __name__ == "__main__":
+    main()
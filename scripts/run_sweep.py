@@ -0,0 +1,57 @@
+# Scenario sweeps over cached enrichment.
+#   python scripts/run_sweep.py enrich --in data/example_listings.csv --enriched out/enriched.jsonl --max-radius 3 --max-buffer 150
+#   python scripts/run_sweep.py sweep --enriched out/enriched.jsonl --out out/sweep.csv \
+#       --grid dc_ac_ratio=1.2,1.3,1.4 --grid search_radius_miles=1,1.5,3
+#   python scripts/run_sweep.py sweep --enriched out/enriched.jsonl --out out/sweep.csv --scenarios scenarios.json
+import argparse, json, os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("cmd", choices=["enrich", "sweep"])
+    ap.add_argument("--in", dest="inp", help="enrich: input CSV with listings")
+    ap.add_argument("--enriched", required=True, help="Enriched sites (JSON lines)")
+    ap.add_argument("--max-radius", type=float, default=None, help="enrich: HC search radius to cache (miles)")
+    ap.add_argument("--max-buffer", type=float, default=None, help="enrich: largest DEC adjacent-area buffer to cache (ft)")
+    ap.add_argument("--out", dest="out", help="sweep: comparison CSV")
+    ap.add_argument("--scenarios", help="sweep: JSON file with a list of {name, <setting>: value} objects")
+    ap.add_argument("--grid", action="append", default=[], help="sweep: key=v1,v2,... (repeatable; cartesian product)")
+    ap.add_argument("--skip-remote", action="store_true", help="Skip online GIS lookups (same as SPN_SKIP_REMOTE=1)")
+    args = ap.parse_args()
+
+    from spn_screener.config import load_settings
+    from spn_screener import scenarios as sc
+
+    settings = load_settings(skip_remote=True) if args.skip_remote else load_settings()
+
+    if args.cmd == "enrich":
+        n = sc.enrich_file(args.inp, args.enriched, settings, args.max_radius, args.max_buffer)
+        print(f"Enriched {n} rows -> {args.enriched}")
+        return
+
+    scenarios = []
+    if args.scenarios:
+        with open(args.scenarios) as f:
+            scenarios.extend(json.load(f))
+    if args.grid:
+        grid = {}
+        for g in args.grid:
+            key, _, values = g.partition("=")
+            grid[key.strip()] = [float(v) for v in values.split(",") if v.strip()]
+        scenarios.extend(sc.grid_scenarios(grid))
+    if not scenarios:
+        scenarios = [{"name": "base"}]
+
+    try:
+        summary = sc.sweep_file(args.enriched, scenarios, args.out, settings)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(2)
+    for s in summary:
+        print(f"{s['scenario']:<50} PASS {s['PASS']:5d}  REVIEW {s['REVIEW']:5d}  FAIL {s['FAIL']:5d}  "
+              f"non-fail AC MW {s['non_fail_req_ac_mw']:.1f}")
+    print(f"Wrote {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,137 @@
 # spn_screener/arcgis_utils.py
 # Safe ArcGIS helpers that won't crash if the server returns HTML or empty text.
+# Every request goes through a per-host circuit breaker: after repeated failures the
+# host is skipped (results flagged "degraded") and probed again after a cooldown.
+# Timeouts adapt to the latency observed for each host.
 
-from typing import Dict, Any
-import requests
+import json
+import math
+import threading
+import time
+from typing import Dict, Any, Optional
+from urllib.parse import urlparse
 
-def _safe_json(resp: requests.Response) -> Dict[str, Any]:
+# requests is imported inside the query helpers so that importing the package stays cheap.
+
+# Breaker defaults; run_pipeline applies per-run values via configure_health().
+FAILURE_THRESHOLD = 3      # consecutive failures before the breaker opens
+COOLDOWN_S = 60.0          # how long an open breaker waits before a recovery probe
+MIN_TIMEOUT_S = 3.0        # adaptive timeouts never go below this
+
+
+class EndpointHealth:
+    """
+    Latency + failure tracking with a circuit breaker for one host.
+    States: "closed" (normal), "open" (skip requests), "half_open" (one probe in flight).
+    """
+
+    def __init__(self, host: str):
+        self.host = host
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.total_failures = 0
+        self.total_successes = 0
+        self.short_circuited = 0
+        self.opened_at = 0.0
+        self.srtt: Optional[float] = None   # smoothed latency (s)
+        self.rttvar = 0.0                   # latency variation (s)
+        self.backoff = 1.0                  # timeout multiplier, doubled on each timeout
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now. An open breaker lets one probe through after the cooldown."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= COOLDOWN_S:
+                self.state = "half_open"
+                return True
+            self.short_circuited += 1
+            return False
+
+    def timeout_for(self, default: float) -> float:
+        """
+        Adaptive timeout (TCP-style RTO): (srtt + 4 * rttvar) * backoff, clamped to [MIN_TIMEOUT_S, default].
+        Uses the full default until the host has answered at least once, and for half-open probes,
+        so a host that has merely slowed down can still close the breaker.
+        """
+        with self._lock:
+            if self.srtt is None or self.state == "half_open":
+                return default
+            rto = max(MIN_TIMEOUT_S, self.srtt + 4.0 * self.rttvar) * self.backoff
+            return min(default, rto)
+
+    def record_success(self, latency_s: float) -> None:
+        with self._lock:
+            if self.srtt is None:
+                self.srtt, self.rttvar = latency_s, latency_s / 2.0
+            else:
+                self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - latency_s)
+                self.srtt = 0.875 * self.srtt + 0.125 * latency_s
+            self.backoff = 1.0
+            self.consecutive_failures = 0
+            self.total_successes += 1
+            self.state = "closed"
+
+    def record_failure(self, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                # the host may just be slower than its history; widen the next timeout (RTO backoff)
+                self.backoff = min(self.backoff * 2.0, 64.0)
+            self.consecutive_failures += 1
+            self.total_failures += 1
+            if self.state == "half_open" or self.consecutive_failures >= FAILURE_THRESHOLD:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "host": self.host,
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failures": self.total_failures,
+                "successes": self.total_successes,
+                "short_circuited": self.short_circuited,
+                "srtt_s": round(self.srtt, 3) if self.srtt is not None else None,
+                "timeout_backoff": self.backoff,
+            }
+
+
+_HEALTH: Dict[str, EndpointHealth] = {}
+_HEALTH_LOCK = threading.Lock()
+
+
+def endpoint_health(url: str) -> EndpointHealth:
+    """Return the (process-wide) health tracker for the host serving url."""
+    host = urlparse(url).netloc or url
+    with _HEALTH_LOCK:
+        if host not in _HEALTH:
+            _HEALTH[host] = EndpointHealth(host)
+        return _HEALTH[host]
+
+
+def health_snapshot() -> Dict[str, Dict[str, Any]]:
+    """Current breaker state for every host contacted so far."""
+    with _HEALTH_LOCK:
+        trackers = list(_HEALTH.values())
+    return {h.host: h.snapshot() for h in trackers}
+
+
+def configure_health(failure_threshold: Optional[int] = None, cooldown_s: Optional[float] = None,
+                     reset: bool = False) -> None:
+    """Set breaker parameters for this process; reset=True forgets all host history."""
+    global FAILURE_THRESHOLD, COOLDOWN_S
+    if failure_threshold is not None:
+        FAILURE_THRESHOLD = int(failure_threshold)
+    if cooldown_s is not None:
+        COOLDOWN_S = float(cooldown_s)
+    if reset:
+        with _HEALTH_LOCK:
+            _HEALTH.clear()
+
+
+def _safe_json(resp) -> Dict[str, Any]:
     """Return JSON if possible; otherwise return an empty, harmless structure."""
     try:
         return resp.json()
@@ -16,8 +143,71 @@ def _safe_json(resp: requests.Response) -> Dict[str, Any]:
             "text_snippet": resp.text[:200] if hasattr(resp, "text") else None,
         }
 
+
+def _is_timeout(exc: Exception) -> bool:
+    try:
+        import requests
+    except ImportError:
+        return False
+    return isinstance(exc, requests.exceptions.Timeout)
+
+
+def _request_json(method: str, url: str, default_timeout: float, **kwargs) -> Dict[str, Any]:
+    """
+    Send a request through the host's circuit breaker. Failures and short-circuits come back
+    as {"features": [], "error": ..., "degraded": True} so callers can tell "no data" from "0 found".
+    """
+    health = endpoint_health(url)
+    if not health.allow():
+        return {"features": [], "error": f"circuit_open: {health.host}", "degraded": True}
+    timeout = health.timeout_for(default_timeout)
+    t0 = time.monotonic()
+    try:
+        import requests
+        r = requests.request(method, url, headers={"User-Agent": "SPN-Screener/0.1"}, timeout=timeout, **kwargs)
+        r.raise_for_status()
+        data = _safe_json(r)
+    except Exception as e:
+        health.record_failure(timed_out=_is_timeout(e))
+        return {"features": [], "error": f"request_failed: {e}", "degraded": True}
+    if not isinstance(data, dict):
+        data = {"features": [], "error": "unexpected_json"}
+    err = data.get("error")
+    if err == "non_json_response" or isinstance(err, dict):
+        # ArcGIS reports errors as HTTP 200 with an {"error": {"code": ...}} body. Only HTML pages
+        # (maintenance banners) and server-side codes (>= 500) mean the host is unwell; 4xx codes
+        # (invalid geometry, unsupported operation) are per-request problems and don't trip the breaker.
+        if err == "non_json_response" or _error_code(err) >= 500:
+            health.record_failure()
+        else:
+            health.record_success(time.monotonic() - t0)
+        data.setdefault("features", [])
+        data["degraded"] = True
+        return data
+    health.record_success(time.monotonic() - t0)
+    return data
+
+
+def _error_code(err: Dict[str, Any]) -> int:
+    """Numeric code of an ArcGIS error body; unknown codes are treated as server errors."""
+    try:
+        return int(err.get("code"))
+    except (TypeError, ValueError):
+        return 500
+
+
+def get_json(url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 20) -> Dict[str, Any]:
+    """GET a JSON document (layer/item metadata) through the circuit breaker."""
+    return _request_json("GET", url, timeout, params=params or {"f": "json"})
+
+
+def is_degraded(res: Any) -> bool:
+    """True if a query result came from a failed or short-circuited request."""
+    return isinstance(res, dict) and bool(res.get("degraded"))
+
+
 def query_point_buffer(layer_url: str, lon: float, lat: float, radius_miles: float, out_fields: str = "*") -> Dict[str, Any]:
-    """Query an ArcGIS layer around a point + radius. Returns empty features on failure."""
+    """Query an ArcGIS layer around a point + radius. Returns empty features (flagged degraded) on failure."""
     buffer_m = radius_miles * 1609.344
     params = {
         "f": "json",
@@ -30,34 +220,97 @@ def query_point_buffer(layer_url: str, lon: float, lat: float, radius_miles: flo
         "units": "esriSRUnit_Meter",
         "outFields": out_fields,
         "returnGeometry": "true",
+        "outSR": "4326",
     }
-    headers = {"User-Agent": "SPN-Screener/0.1"}
-    try:
-        r = requests.get(f"{layer_url}/query", params=params, headers=headers, timeout=25)
-        r.raise_for_status()
-        return _safe_json(r)
-    except Exception as e:
-        return {"features": [], "error": f"request_failed: {e}"}
+    return _request_json("GET", f"{layer_url}/query", 25, params=params)
+
 
-def query_polygon_intersect(layer_url: str, polygon_geojson: Dict[str, Any], out_fields: str = "*") -> Dict[str, Any]:
-    """Query an ArcGIS layer for features intersecting a polygon."""
+def query_polygon_intersect(layer_url: str, polygon_geojson: Dict[str, Any], out_fields: str = "*",
+                            distance_m: float = 0.0) -> Dict[str, Any]:
+    """Query an ArcGIS layer for features intersecting a polygon (grown by distance_m, server-side, if > 0)."""
     rings = polygon_geojson["coordinates"]
+    if polygon_geojson.get("type") == "MultiPolygon":
+        # ESRI polygons are a flat list of rings (multi-part parcels from the parcel store)
+        rings = [ring for poly in rings for ring in poly]
     geom = {"rings": rings, "spatialReference": {"wkid": 4326}}
+    # ArcGIS REST reads query-string / form fields only, with geometry as a JSON string
     params = {
         "f": "json",
         "where": "1=1",
-        "geometry": geom,
+        "geometry": json.dumps(geom),
         "geometryType": "esriGeometryPolygon",
         "inSR": "4326",
         "spatialRel": "esriSpatialRelIntersects",
         "outFields": out_fields,
         "returnGeometry": "true",
+        "outSR": "4326",
     }
-    headers = {"User-Agent": "SPN-Screener/0.1"}
-    try:
-        r = requests.post(f"{layer_url}/query", json=params, headers=headers, timeout=45)
-        r.raise_for_status()
-        return _safe_json(r)
-    except Exception as e:
-        return {"features": [], "error": f"request_failed: {e}"}
+    if distance_m > 0:
+        params.update({"distance": distance_m, "units": "esriSRUnit_Meter"})
+    return _request_json("POST", f"{layer_url}/query", 45, data=params)
+
+
+# ---------- ESRI JSON geometry helpers (lon/lat, outSR=4326) ----------
+def _ring_signed_area(ring) -> float:
+    return 0.5 * sum(x1 * y2 - x2 * y1 for (x1, y1, *_), (x2, y2, *_) in zip(ring, ring[1:]))
+
+
+def esri_to_geojson(geom: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Convert an ESRI JSON geometry (point / paths / rings) to GeoJSON. GeoJSON input is returned as-is.
+    ESRI outer rings are clockwise and holes counter-clockwise; each outer ring starts a new polygon.
+    """
+    if not isinstance(geom, dict):
+        return None
+    if "type" in geom:
+        return geom
+    if "x" in geom and "y" in geom:
+        return {"type": "Point", "coordinates": [geom["x"], geom["y"]]}
+    if geom.get("paths"):
+        return {"type": "MultiLineString", "coordinates": geom["paths"]}
+    if geom.get("rings"):
+        polys = []
+        for ring in geom["rings"]:
+            if _ring_signed_area(ring) <= 0 or not polys:
+                polys.append([ring])
+            else:
+                polys[-1].append(ring)
+        return {"type": "MultiPolygon", "coordinates": polys}
+    return None
+
+
+def _point_segment_m(px: float, py: float, ax: float, ay: float, bx: float, by: float) -> float:
+    dx, dy = bx - ax, by - ay
+    t = 0.0 if dx == dy == 0 else max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)))
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
 
+def distance_to_geometry_m(lon: float, lat: float, geom: Dict[str, Any]) -> Optional[float]:
+    """
+    Approximate distance in meters from (lon, lat) to an ESRI/GeoJSON point or line geometry
+    (local equirectangular projection; fine at screening radii). None if the geometry is unusable.
+    """
+    kx, ky = 111_139.0 * math.cos(math.radians(lat)), 111_139.0
+    g = esri_to_geojson(geom) or {}
+    coords = g.get("coordinates")
+    gtype = g.get("type")
+    if gtype == "Point":
+        lines = [[coords]]
+    elif gtype in ("LineString", "MultiPoint"):
+        lines = [coords]
+    elif gtype in ("MultiLineString", "Polygon"):
+        lines = coords
+    elif gtype == "MultiPolygon":
+        lines = [ring for poly in coords for ring in poly]
+    else:
+        return None
+    best = None
+    for line in lines:
+        pts = [((x - lon) * kx, (y - lat) * ky) for x, y, *_ in line]
+        if len(pts) == 1:
+            pts = pts * 2
+        for (ax, ay), (bx, by) in zip(pts, pts[1:]):
+            d = _point_segment_m(0.0, 0.0, ax, ay, bx, by)
+            if best is None or d < best:
+                best = d
+    return best
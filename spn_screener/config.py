@@ -1,9 +1,96 @@
 import os
+from dataclasses import dataclass, replace
+from typing import Mapping, Optional, Tuple
 
-SEARCH_RADIUS_MILES = float(os.getenv("SEARCH_RADIUS_MILES", 1.5))
-DC_PER_ACRE_KW = float(os.getenv("DC_PER_ACRE_KW", 400_000))
-DC_AC_RATIO = float(os.getenv("DC_AC_RATIO", 1.3))
-DEC_ADJ_BUFFER_FT = float(os.getenv("DEC_ADJ_BUFFER_FT", 100))
+# Utilities with hosting capacity adapters (hc_adapters.py); sources come from
+# SPN_HC_<KEY>_WEBMAP (ArcGIS item id) and SPN_HC_<KEY>_LAYERS (comma-separated layer URLs).
+HC_UTILITY_KEYS = ("NG", "NYSEG", "RGE", "CENHUD", "ORU")
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Run configuration. Resolved from the environment when a run starts (load_settings),
+    not when modules are imported, so one process can run with different settings.
+    """
+    search_radius_miles: float = 1.5
+    dc_per_acre_kw: float = 400_000
+    dc_ac_ratio: float = 1.3
+    dec_adj_buffer_ft: float = 100
+    skip_remote: bool = False
+    cache_dir: str = ".spn_cache"
+    zoning_code_urls: str = ""
+    breaker_failures: int = 3
+    breaker_cooldown_s: float = 60.0
+    # Screening thresholds
+    max_price_usd: float = 5_000_000
+    min_acres: float = 5
+    min_dc_kw: float = 750
+    # Geocoding of address-only rows (see geocode.py)
+    auto_geocode: bool = False
+    geocoder: str = "census"
+    address_index: str = ""
+    # Parcel footprint store (see parcels.py); empty = square-by-acres proxy
+    parcel_store: str = ""
+    # Hosting capacity sources per utility key: ((key, webmap item, (layer URLs...)), ...);
+    # utilities not listed use their built-in source, if any (see hc_adapters.default_adapters)
+    hc_sources: Tuple[Tuple[str, str, Tuple[str, ...]], ...] = ()
+
+
+def _hc_sources(env: Mapping[str, str]) -> Tuple[Tuple[str, str, Tuple[str, ...]], ...]:
+    out = []
+    for key in HC_UTILITY_KEYS:
+        webmap = env.get(f"SPN_HC_{key}_WEBMAP", "").strip()
+        layers = tuple(u.strip() for u in env.get(f"SPN_HC_{key}_LAYERS", "").split(",") if u.strip())
+        if webmap or layers:
+            out.append((key, webmap, layers))
+    return tuple(out)
+
+
+def load_settings(env: Optional[Mapping[str, str]] = None, **overrides) -> Settings:
+    """Build Settings from env (default: os.environ), then apply keyword overrides."""
+    env = os.environ if env is None else env
+    s = Settings(
+        search_radius_miles=float(env.get("SEARCH_RADIUS_MILES", 1.5)),
+        dc_per_acre_kw=float(env.get("DC_PER_ACRE_KW", 400_000)),
+        dc_ac_ratio=float(env.get("DC_AC_RATIO", 1.3)),
+        dec_adj_buffer_ft=float(env.get("DEC_ADJ_BUFFER_FT", 100)),
+        skip_remote=env.get("SPN_SKIP_REMOTE") == "1",
+        cache_dir=env.get("SPN_CACHE_DIR", os.path.join(os.getcwd(), ".spn_cache")),
+        zoning_code_urls=env.get("SPN_ZONING_CODE_URLS", ""),
+        breaker_failures=int(env.get("SPN_BREAKER_FAILURES", 3)),
+        breaker_cooldown_s=float(env.get("SPN_BREAKER_COOLDOWN_S", 60)),
+        max_price_usd=float(env.get("MAX_PRICE_USD", 5_000_000)),
+        min_acres=float(env.get("MIN_ACRES", 5)),
+        min_dc_kw=float(env.get("MIN_DC_KW", 750)),
+        auto_geocode=env.get("AUTO_GEOCODE", "").lower() in ("1", "true", "yes"),
+        geocoder=env.get("SPN_GEOCODER", "census"),
+        address_index=env.get("SPN_ADDRESS_INDEX", ""),
+        parcel_store=env.get("SPN_PARCEL_STORE", ""),
+        hc_sources=_hc_sources(env),
+    )
+    return replace(s, **overrides) if overrides else s
+
+
+# Legacy module constants (SEARCH_RADIUS_MILES, CACHE_DIR, ...), kept for callers that read
+# them directly. They are resolved from the environment on access, never at import time.
+_LEGACY_CONSTANTS = {
+    "SEARCH_RADIUS_MILES": "search_radius_miles",
+    "DC_PER_ACRE_KW": "dc_per_acre_kw",
+    "DC_AC_RATIO": "dc_ac_ratio",
+    "DEC_ADJ_BUFFER_FT": "dec_adj_buffer_ft",
+    # Local on-disk caches (zoning code store, etc.). Shared across runs/processes.
+    "CACHE_DIR": "cache_dir",
+    # Optional CSV mapping municipalities to their online code (eCode360/Municode) URL.
+    # Columns: municipality, county, url
+    "ZONING_CODE_URLS": "zoning_code_urls",
+}
+
+
+def __getattr__(name: str):
+    if name in _LEGACY_CONSTANTS:
+        return getattr(load_settings(), _LEGACY_CONSTANTS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ArcGIS REST Endpoints (documented in README with citations)
 ENDPOINTS = {
@@ -16,7 +103,7 @@ ENDPOINTS = {
     "nwi_wetlands": "https://fwspublicservices.wim.usgs.gov/wetlandsmapservice/rest/services/Wetlands/MapServer/0",
     # National Grid NY Hosting Capacity (MapServer root)
     "ng_hosting_capacity_root": "https://systemdataportal.nationalgrid.com/arcgis/rest/services/NYSDP/Hosting_Capacity_Data/MapServer",
-    # NYSEG/RGE & others can be added as discovered
+    # NYSEG/RGE, Central Hudson, O&R: configured as hosting capacity adapters (see hc_adapters.py)
 }
 
 # Land cover (USDA CDL imagery service — example ArcGIS item, may be proxied via STAC in production)
@@ -0,0 +1,280 @@
+# spn_screener/geocode.py
+# Batch geocoding for address-only listings.
+# Addresses are normalized and deduplicated, then resolved in bulk against:
+#   1) a persistent cache of earlier results (CACHE_DIR/geocode.sqlite),
+#   2) a local SQLite index built from a NY address-point export (build_address_index),
+#   3) an optional online geocoder (pluggable; US Census by default) for what's left.
+# Lookups are batched SQL IN queries over unique keys, so large sheets resolve in one pass.
+
+import csv
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Iterable, List, Optional, Tuple
+
+from .config import Settings, load_settings
+
+# An online geocoder takes a one-line address and returns (lat, lon), or None when the service
+# answered with no match. If the service could not be asked (request failed, circuit open) it
+# raises GeocoderUnavailable, and the address is retried on a later run instead of cached as a miss.
+OnlineGeocoder = Callable[[str], Optional[Tuple[float, float]]]
+
+
+class GeocoderUnavailable(Exception):
+    """Raised by an online geocoder when it could not get an answer from its service."""
+
+_SQL_CHUNK = 900   # stay under SQLite's bound-parameter limit
+
+# USPS-style abbreviations so "17031 State Route 22" and "17031 STATE RTE 22" share a key
+_ABBREV = {
+    "STREET": "ST", "ROAD": "RD", "AVENUE": "AVE", "AV": "AVE", "DRIVE": "DR", "LANE": "LN",
+    "COURT": "CT", "PLACE": "PL", "BOULEVARD": "BLVD", "HIGHWAY": "HWY", "ROUTE": "RTE",
+    "RT": "RTE", "TURNPIKE": "TPKE", "TERRACE": "TER", "CIRCLE": "CIR", "PARKWAY": "PKWY",
+    "TRAIL": "TRL", "EXTENSION": "EXT", "HILL": "HL", "CENTER": "CTR", "MOUNT": "MT",
+    "SAINT": "ST", "NORTH": "N", "SOUTH": "S", "EAST": "E", "WEST": "W",
+}
+
+
+def normalize_street(street: str) -> str:
+    """Uppercase, strip punctuation, collapse whitespace and abbreviate street words."""
+    s = re.sub(r"[^\w\s]", " ", (street or "").upper())
+    tokens = [_ABBREV.get(t, t) for t in s.split()]
+    # "0 River Rd" style numbers are kept; leading zeros in house numbers are not meaningful
+    if tokens and tokens[0].isdigit():
+        tokens[0] = str(int(tokens[0]))
+    return " ".join(tokens)
+
+
+def address_keys(street: str, city: str = "", zip_code: str = "") -> List[str]:
+    """Lookup keys for an address, most specific first: 'STREET|ZIP5', then 'STREET|CITY'."""
+    st = normalize_street(street)
+    if not st:
+        return []
+    keys = []
+    z = re.sub(r"\D", "", str(zip_code or ""))[:5]
+    if len(z) == 5:
+        keys.append(f"{st}|{z}")
+    c = " ".join(re.sub(r"[^\w\s]", " ", (city or "").upper()).split())
+    if c:
+        keys.append(f"{st}|{c}")
+    return keys
+
+
+def _has_coords(row: Dict[str, Any]) -> bool:
+    try:
+        return bool(str(row.get("lat", "")).strip()) and bool(str(row.get("lon", "")).strip()) \
+            and float(row["lat"]) == float(row["lat"]) and float(row["lon"]) == float(row["lon"])
+    except (TypeError, ValueError):
+        return False
+
+
+def _lookup_many(conn: sqlite3.Connection, table: str, keys: List[str]) -> Dict[str, Tuple[Optional[float], Optional[float]]]:
+    found: Dict[str, Tuple[Optional[float], Optional[float]]] = {}
+    for i in range(0, len(keys), _SQL_CHUNK):
+        chunk = keys[i:i + _SQL_CHUNK]
+        marks = ",".join("?" * len(chunk))
+        for k, lat, lon in conn.execute(f"SELECT key, lat, lon FROM {table} WHERE key IN ({marks})", chunk):
+            found[k] = (lat, lon)
+    return found
+
+
+# ---------- Local address-point index ----------
+def build_address_index(csv_path: str, db_path: str, street_cols: Iterable[str] = ("address",),
+                        city_col: str = "city", zip_col: str = "zip",
+                        lat_col: str = "lat", lon_col: str = "lon") -> int:
+    """
+    Build (or extend) the SQLite address index from an address-point CSV export.
+    street_cols are joined with spaces, e.g. ("AddressNumber", "CompleteStreetName") for NYS SAM.
+    Returns the number of keys written.
+    """
+    street_cols = list(street_cols)
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE IF NOT EXISTS addresses (key TEXT PRIMARY KEY, lat REAL, lon REAL) WITHOUT ROWID")
+    n = 0
+    batch: List[Tuple[str, float, float]] = []
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        for r in csv.DictReader(f):
+            try:
+                lat, lon = float(r[lat_col]), float(r[lon_col])
+            except (KeyError, TypeError, ValueError):
+                continue
+            street = " ".join(str(r.get(c) or "") for c in street_cols)
+            for k in address_keys(street, r.get(city_col, ""), r.get(zip_col, "")):
+                batch.append((k, lat, lon))
+            if len(batch) >= 50_000:
+                conn.executemany("INSERT OR REPLACE INTO addresses VALUES (?, ?, ?)", batch)
+                n += len(batch)
+                batch = []
+    conn.executemany("INSERT OR REPLACE INTO addresses VALUES (?, ?, ?)", batch)
+    n += len(batch)
+    conn.commit()
+    conn.close()
+    return n
+
+
+# ---------- Online fallbacks ----------
+def census_geocoder(one_line: str) -> Optional[Tuple[float, float]]:
+    """US Census Bureau one-line address geocoder (no API key). Goes through the circuit breaker."""
+    from .arcgis_utils import get_json, is_degraded
+    res = get_json("https://geocoding.geo.census.gov/geocoder/locations/onelineaddress",
+                   params={"address": one_line, "benchmark": "Public_AR_Current", "format": "json"}, timeout=20)
+    if is_degraded(res):
+        raise GeocoderUnavailable(res.get("error"))
+    matches = ((res.get("result") or {}).get("addressMatches") or [])
+    if not matches:
+        return None
+    c = matches[0].get("coordinates") or {}
+    try:
+        return float(c["y"]), float(c["x"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+ONLINE_GEOCODERS: Dict[str, OnlineGeocoder] = {"census": census_geocoder}
+
+
+# ---------- Batch geocoder ----------
+_UNAVAILABLE = object()
+
+
+class BatchGeocoder:
+    """
+    Resolve many rows at once: persistent cache -> local address index -> online fallback.
+    Only real answers are cached; a remembered online miss still gets the local index (which may
+    have been built since), but is not sent online again.
+    """
+
+    def __init__(self, cache_path: str, index_path: Optional[str] = None,
+                 online: Optional[OnlineGeocoder] = None, online_workers: int = 4):
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        self.cache = sqlite3.connect(cache_path, timeout=30)
+        self.cache.execute(
+            "CREATE TABLE IF NOT EXISTS geocode_cache "
+            "(key TEXT PRIMARY KEY, lat REAL, lon REAL, source TEXT, t REAL) WITHOUT ROWID"
+        )
+        self.index = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True) \
+            if index_path and os.path.exists(index_path) else None
+        self.online = online
+        self.online_workers = online_workers
+
+    def _store(self, results: Dict[str, Tuple[Optional[float], Optional[float], str]]) -> None:
+        now = time.time()
+        with self.cache:
+            self.cache.executemany(
+                "INSERT OR REPLACE INTO geocode_cache VALUES (?, ?, ?, ?, ?)",
+                [(k, lat, lon, src, now) for k, (lat, lon, src) in results.items()],
+            )
+
+    def resolve(self, addresses: Dict[str, Tuple[List[str], str]]) -> Dict[str, Tuple[Optional[float], Optional[float], str]]:
+        """
+        addresses: {primary_key: ([lookup keys...], one_line_address)} for unique addresses.
+        Returns {primary_key: (lat, lon, source)}; lat/lon are None when nothing matched
+        (source "miss", or "unavailable" if the online geocoder could not be reached).
+        """
+        out: Dict[str, Tuple[Optional[float], Optional[float], str]] = {}
+        primaries = list(addresses)
+
+        # 1) persistent cache; remembered online misses skip the online step but not the index
+        known_miss = set()
+        for k, (lat, lon) in _lookup_many(self.cache, "geocode_cache", primaries).items():
+            if lat is not None and lon is not None:
+                out[k] = (lat, lon, "cache")
+            else:
+                known_miss.add(k)
+        todo = [k for k in primaries if k not in out]
+
+        # 2) local address-point index, trying every key variant in one batched pass
+        new: Dict[str, Tuple[Optional[float], Optional[float], str]] = {}
+        if self.index is not None and todo:
+            variants = list(dict.fromkeys(v for k in todo for v in addresses[k][0]))
+            hits = _lookup_many(self.index, "addresses", variants)
+            for k in todo:
+                hit = next((hits[v] for v in addresses[k][0] if v in hits), None)
+                if hit:
+                    new[k] = (hit[0], hit[1], "index")
+            todo = [k for k in todo if k not in new]
+
+        # 3) online fallback for what's left
+        ask = [k for k in todo if k not in known_miss]
+        if self.online is not None and ask:
+            with ThreadPoolExecutor(max_workers=self.online_workers) as pool:
+                found = list(pool.map(lambda k: self._ask_online(addresses[k][1]), ask))
+            for k, ll in zip(ask, found):
+                if ll is _UNAVAILABLE:
+                    out[k] = (None, None, "unavailable")   # not cached: retried next run
+                else:
+                    new[k] = (ll[0], ll[1], "online") if ll else (None, None, "miss")
+
+        self._store(new)
+        out.update(new)
+        for k in todo:
+            out.setdefault(k, (None, None, "miss"))
+        return out
+
+    def _ask_online(self, one_line: str):
+        try:
+            return self.online(one_line)
+        except GeocoderUnavailable:
+            return _UNAVAILABLE
+
+
+def geocode_rows(rows: List[Dict[str, Any]], settings: Optional[Settings] = None,
+                 online: Optional[OnlineGeocoder] = None) -> Dict[str, int]:
+    """
+    Fill lat/lon in place for rows that lack them (address, city, state, zip columns).
+    Adds "geocode_source" (cache / index / online / miss / unavailable) to those rows.
+    Returns counts per source.
+    """
+    settings = settings or load_settings()
+    if online is None and settings.geocoder and not settings.skip_remote:
+        online = ONLINE_GEOCODERS.get(settings.geocoder)
+
+    addresses: Dict[str, Tuple[List[str], str]] = {}
+    row_keys: List[Tuple[Dict[str, Any], str]] = []
+    for r in rows:
+        if _has_coords(r):
+            continue
+        keys = address_keys(r.get("address", ""), r.get("city", ""), r.get("zip", ""))
+        if not keys:
+            r["geocode_source"] = "miss"
+            continue
+        one_line = f"{r.get('address', '')}, {r.get('city', '')}, {r.get('state', '') or 'NY'} {r.get('zip', '')}"
+        addresses.setdefault(keys[0], (keys, one_line))
+        row_keys.append((r, keys[0]))
+
+    counts: Dict[str, int] = {}
+    if not addresses:
+        return counts
+    geocoder = BatchGeocoder(os.path.join(settings.cache_dir, "geocode.sqlite"),
+                             settings.address_index or None, online)
+    results = geocoder.resolve(addresses)
+    for r, k in row_keys:
+        lat, lon, src = results[k]
+        if lat is not None and lon is not None:
+            r["lat"], r["lon"] = lat, lon
+        elif src != "unavailable":
+            src = "miss"
+        r["geocode_source"] = src
+        counts[src] = counts.get(src, 0) + 1
+    return counts
+
+
+def geocode_file(csv_in: str, csv_out: str, settings: Optional[Settings] = None) -> Dict[str, int]:
+    """Geocode a listings CSV and write it back out with lat/lon (and geocode_source) filled."""
+    with open(csv_in, newline="") as f:
+        reader = csv.DictReader(f)
+        fieldnames = list(reader.fieldnames or [])
+        rows = list(reader)
+    counts = geocode_rows(rows, settings)
+    for col in ("lat", "lon", "geocode_source"):
+        if col not in fieldnames:
+            fieldnames.append(col)
+    os.makedirs(os.path.dirname(csv_out) or ".", exist_ok=True)
+    with open(csv_out, "w", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=fieldnames, restval="")
+        w.writeheader()
+        w.writerows(rows)
+    return counts
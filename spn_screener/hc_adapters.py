@@ -0,0 +1,234 @@
+# spn_screener/hc_adapters.py
+# Utility-pluggable hosting capacity (HC) lookups.
+# Each UtilityAdapter declares where its HC layers live (ArcGIS web map item and/or layer URLs),
+# which attribute fields hold numeric capacity, and which symbol colors mean "capacity available".
+# A CapacityScheduler picks the adapters whose territory can reach a site, queries all their
+# layers concurrently, and reuses layer lists / renderer rules from a metadata cache, so adding
+# utilities adds parallel requests rather than per-row latency.
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+from .arcgis_utils import query_point_buffer, get_json, is_degraded, distance_to_geometry_m
+from .config import Settings, load_settings
+from .hosting_capacity import (
+    NG_WEBMAP_ITEM,
+    _CAP_FIELDS,
+    _is_blue_or_green,
+    _extract_colored_classes,
+    _feature_is_blue_green,
+    _webmap_layer_urls,
+)
+
+# (min_lon, min_lat, max_lon, max_lat). Coarse boxes used only to skip utilities that cannot
+# serve a site; the authoritative answer is whichever utility's layers return features.
+NY_BBOX = (-79.8, 40.4, -71.8, 45.1)
+
+META_TTL_S = 24 * 3600   # layer lists / renderers change rarely
+
+
+@dataclass(frozen=True)
+class UtilityAdapter:
+    name: str
+    webmap_item: Optional[str] = None                 # ArcGIS Online web map with HC operational layers
+    layer_urls: Tuple[str, ...] = ()                  # explicit HC layer URLs (added to the web map's)
+    capacity_fields: Tuple[str, ...] = _CAP_FIELDS    # numeric MW fields, first match wins
+    bbox: Tuple[float, float, float, float] = NY_BBOX
+    accept_color: Callable[[List[int]], bool] = _is_blue_or_green
+
+    def configured(self) -> bool:
+        return bool(self.webmap_item or self.layer_urls)
+
+    def covers(self, lon: float, lat: float, radius_miles: float = 0.0) -> bool:
+        """Whether the site (plus search radius) touches this utility's territory box."""
+        pad = radius_miles / 69.0
+        min_lon, min_lat, max_lon, max_lat = self.bbox
+        return (min_lon - pad) <= lon <= (max_lon + pad) and (min_lat - pad) <= lat <= (max_lat + pad)
+
+
+# (settings key, display name, territory box, built-in web map item)
+_UTILITIES = (
+    ("NG", "National Grid", (-79.8, 40.5, -73.2, 45.1), NG_WEBMAP_ITEM),
+    ("NYSEG", "NYSEG", (-79.8, 41.3, -73.3, 45.1), None),
+    ("RGE", "RG&E", (-78.4, 42.4, -76.8, 43.4), None),
+    ("CENHUD", "Central Hudson", (-74.8, 41.3, -73.5, 42.6), None),
+    ("ORU", "O&R", (-74.8, 41.0, -73.9, 41.7), None),
+)
+
+
+def default_adapters(settings: Optional[Settings] = None) -> List[UtilityAdapter]:
+    """
+    Built-in adapters, with HC sources from settings.hc_sources. National Grid's public web map
+    is known; the other utilities publish HC maps whose items change, so their sources must be
+    configured (SPN_HC_<KEY>_WEBMAP / _LAYERS) and the adapter is skipped until they are.
+    """
+    settings = settings or load_settings()
+    sources = {key: (webmap, layers) for key, webmap, layers in settings.hc_sources}
+    adapters = []
+    for key, name, bbox, builtin in _UTILITIES:
+        webmap, layers = sources.get(key, ("", ()))
+        adapters.append(UtilityAdapter(name=name, webmap_item=webmap or builtin,
+                                       layer_urls=tuple(layers), bbox=bbox))
+    return adapters
+
+
+class LayerMetadataCache:
+    """
+    Web map layer lists and per-adapter renderer rules, kept in memory and (optionally) in a
+    JSON file under the cache directory so other runs and shards skip the metadata requests.
+    Failed fetches are never cached.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl_s: float = META_TTL_S):
+        self.path = path
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._webmaps: Dict[str, Dict[str, Any]] = {}
+        self._rules: Dict[str, Dict[str, Any]] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+                self._webmaps = data.get("webmaps", {})
+                self._rules = data.get("rules", {})
+            except (OSError, ValueError):
+                pass
+
+    def _fresh(self, entry: Optional[Dict[str, Any]]) -> bool:
+        return bool(entry) and time.time() - entry.get("t", 0) < self.ttl_s
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with self._lock:
+            data = {"webmaps": dict(self._webmaps), "rules": dict(self._rules)}
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def layer_urls(self, adapter: UtilityAdapter) -> Tuple[List[str], bool]:
+        """All HC layer URLs for an adapter. Returns (urls, degraded)."""
+        urls: List[str] = []
+        degraded = False
+        item = adapter.webmap_item
+        if item:
+            with self._lock:
+                entry = self._webmaps.get(item)
+            if self._fresh(entry):
+                urls = list(entry["urls"])
+            else:
+                urls, degraded = _webmap_layer_urls(item)
+                if not degraded:
+                    with self._lock:
+                        self._webmaps[item] = {"urls": urls, "t": time.time()}
+                    self._save()
+        return list(dict.fromkeys(urls + list(adapter.layer_urls))), degraded
+
+    def rule(self, adapter: UtilityAdapter, layer_url: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Color rule (see _extract_colored_classes) for a layer under an adapter's color semantics.
+        Returns (rule, degraded); rule is None for layers without a renderer or when the fetch failed.
+        """
+        key = f"{adapter.name}|{layer_url}"
+        with self._lock:
+            entry = self._rules.get(key)
+        if self._fresh(entry):
+            rule = entry["rule"]
+        else:
+            meta = get_json(layer_url, params={"f": "pjson"}, timeout=15)
+            if is_degraded(meta):
+                return None, True
+            ren = (meta.get("drawingInfo") or {}).get("renderer")
+            # layers without a renderer are cached as rule=None so they aren't re-fetched per row
+            rule = None
+            if ren:
+                rule = _extract_colored_classes(ren, adapter.accept_color)
+                rule = {**rule, "accept_values": list(rule["accept_values"])}
+            with self._lock:
+                self._rules[key] = {"rule": rule, "t": time.time()}
+            self._save()
+        if rule is None:
+            return None, False
+        return {**rule, "accept_values": set(rule.get("accept_values") or [])}, False
+
+
+class CapacityScheduler:
+    """Fan HC queries out to the relevant adapters' layers on a shared thread pool."""
+
+    def __init__(self, adapters: Optional[List[UtilityAdapter]] = None,
+                 cache: Optional[LayerMetadataCache] = None, max_workers: int = 8):
+        self.adapters = default_adapters() if adapters is None else adapters
+        self.cache = cache or LayerMetadataCache()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hc")
+
+    def relevant(self, lon: float, lat: float, radius_miles: float) -> List[UtilityAdapter]:
+        return [a for a in self.adapters if a.configured() and a.covers(lon, lat, radius_miles)]
+
+    def _query_layer(self, adapter: UtilityAdapter, layer_url: str, lon: float, lat: float,
+                     radius_miles: float) -> Tuple[List[Dict[str, Any]], bool]:
+        # without the renderer, blue/green can't be judged: the layer's result is degraded
+        rule, rule_degraded = self.cache.rule(adapter, layer_url)
+        res = query_point_buffer(layer_url, lon, lat, radius_miles, out_fields="*")
+        records = []
+        for feat in res.get("features", []):
+            attrs = feat.get("attributes", {}) or {}
+            cap = next((attrs.get(f) for f in adapter.capacity_fields if isinstance(attrs.get(f), (int, float))), None)
+            dist = distance_to_geometry_m(lon, lat, feat.get("geometry") or {})
+            records.append({
+                "utility": adapter.name,
+                "layer": layer_url,
+                "mw": float(cap) if cap is not None else None,
+                # unknown geometry: the server said it is within the radius
+                "dist_m": round(dist, 1) if dist is not None else 0.0,
+                "blue_green": bool(rule) and _feature_is_blue_green(attrs, rule),
+            })
+        return records, is_degraded(res) or rule_degraded
+
+    def features_near(self, lon: float, lat: float, radius_miles: float) -> Dict[str, Any]:
+        """
+        HC feature records from every relevant utility within the radius:
+          {"features": [{"utility", "layer", "mw", "dist_m", "blue_green"}], "degraded": bool, "utilities": [...]}
+        Layer lists for all adapters are resolved concurrently, then every layer is queried concurrently.
+        """
+        adapters = self.relevant(lon, lat, radius_miles)
+        out: Dict[str, Any] = {"features": [], "degraded": False, "utilities": [a.name for a in adapters]}
+        layer_lists = list(self._pool.map(self.cache.layer_urls, adapters))
+        jobs = []
+        for adapter, (urls, degraded) in zip(adapters, layer_lists):
+            out["degraded"] = out["degraded"] or degraded
+            for u in urls:
+                jobs.append(self._pool.submit(self._query_layer, adapter, u, lon, lat, radius_miles))
+        for job in jobs:
+            try:
+                records, degraded = job.result()
+            except Exception:
+                records, degraded = [], True
+            out["features"].extend(records)
+            out["degraded"] = out["degraded"] or degraded
+        return out
+
+
+_SCHEDULERS: Dict[Tuple[str, Any], CapacityScheduler] = {}
+_SCHEDULERS_LOCK = threading.Lock()
+
+
+def get_scheduler(settings: Optional[Settings] = None) -> CapacityScheduler:
+    """
+    Process-wide scheduler for a run's settings: the default adapters with settings.hc_sources and a
+    metadata cache under settings.cache_dir. Runs with different sources get different schedulers.
+    """
+    settings = settings or load_settings()
+    cache_dir = settings.cache_dir
+    key = (cache_dir, settings.hc_sources)
+    with _SCHEDULERS_LOCK:
+        if key not in _SCHEDULERS:
+            cache = LayerMetadataCache(os.path.join(cache_dir, "hc_layer_metadata.json"))
+            _SCHEDULERS[key] = CapacityScheduler(default_adapters(settings), cache)
+        return _SCHEDULERS[key]
@@ -1,12 +1,11 @@
 # spn_screener/hosting_capacity.py
 # Color-based hosting capacity screening for National Grid (NY).
 # We detect "potential capacity" if any nearby HC feature is rendered in BLUE or GREEN
-# on the utility’s ArcGIS web map. (Other utilities can be added similarly.)
+# on the utility’s ArcGIS web map. Other utilities plug in via hc_adapters.py.
 
-from typing import Dict, Any, List, Optional, Tuple
-import requests
+from typing import Callable, Dict, Any, List, Optional, Tuple
 
-from .arcgis_utils import query_point_buffer
+from .arcgis_utils import query_point_buffer, get_json, is_degraded
 
 # -------------------------
 # National Grid (NY) Web Map item (ArcGIS Online) for PV Hosting Capacity
@@ -40,10 +39,16 @@ def _is_blue(rgb: List[int]) -> bool:
     return (b >= 120) and (b > r + 20) and (b > g + 20)
 
 
+def _is_blue_or_green(rgb: List[int]) -> bool:
+    return _is_blue(rgb) or _is_green(rgb)
+
+
 # ---------- Renderer parsing ----------
-def _extract_colored_classes(renderer: Dict[str, Any]) -> Dict[str, Any]:
+def _extract_colored_classes(renderer: Dict[str, Any],
+                             accept_color: Callable[[List[int]], bool] = _is_blue_or_green) -> Dict[str, Any]:
     """
-    Parse an ESRI renderer (simple / uniqueValue / classBreaks) and return:
+    Parse an ESRI renderer (simple / uniqueValue / classBreaks) and return the classes whose
+    symbol color passes accept_color (default: blue or green):
       {
         "fields": [field names that drive the renderer]  (may be empty)
         "accept_all": True if the whole layer is blue/green (simple renderer)
@@ -66,7 +71,7 @@ def _extract_colored_classes(renderer: Dict[str, Any]) -> Dict[str, Any]:
     if rtype == "simple":
         sym = renderer.get("symbol", {}) or {}
         color = sym.get("color") or (sym.get("outline", {}) or {}).get("color")
-        if isinstance(color, list) and (_is_blue(color) or _is_green(color)):
+        if isinstance(color, list) and accept_color(color):
             out["accept_all"] = True
         return out
 
@@ -77,7 +82,7 @@ def _extract_colored_classes(renderer: Dict[str, Any]) -> Dict[str, Any]:
         for info in (renderer.get("uniqueValueInfos") or []):
             sym = (info or {}).get("symbol", {}) or {}
             color = sym.get("color") or (sym.get("outline", {}) or {}).get("color")
-            if isinstance(color, list) and (_is_blue(color) or _is_green(color)):
+            if isinstance(color, list) and accept_color(color):
                 # Accept this class's "value"
                 val = info.get("value")
                 if val is not None:
@@ -92,7 +97,7 @@ def _extract_colored_classes(renderer: Dict[str, Any]) -> Dict[str, Any]:
         for info in (renderer.get("classBreakInfos") or []):
             sym = (info or {}).get("symbol", {}) or {}
             color = sym.get("color") or (sym.get("outline", {}) or {}).get("color")
-            if isinstance(color, list) and (_is_blue(color) or _is_green(color)):
+            if isinstance(color, list) and accept_color(color):
                 mn = info.get("minValue")
                 mx = info.get("maxValue")
                 out["accept_ranges"].append((mn, mx))
@@ -102,41 +107,41 @@ def _extract_colored_classes(renderer: Dict[str, Any]) -> Dict[str, Any]:
 
 
 # ---------- ArcGIS helpers ----------
+def _webmap_layer_urls(item_id: str) -> Tuple[List[str], bool]:
+    """
+    Read an ArcGIS Web Map item and extract all operational layer URLs (and sublayers).
+    Returns (urls, degraded) — degraded is True when the item could not be fetched.
+    """
+    item_url = f"https://www.arcgis.com/sharing/rest/content/items/{item_id}/data"
+    data = get_json(item_url, params={"f": "json"}, timeout=20)
+    if is_degraded(data):
+        return [], True
+    urls: List[str] = []
+    for lyr in (data.get("operationalLayers") or []):
+        if isinstance(lyr, dict):
+            if isinstance(lyr.get("url"), str):
+                urls.append(lyr["url"])
+            for sl in (lyr.get("layers") or []):
+                if isinstance(sl, dict) and isinstance(sl.get("url"), str):
+                    urls.append(sl["url"])
+    # dedupe while preserving order
+    return list(dict.fromkeys(urls)), False
+
+
 def _get_layer_urls_from_webmap(item_id: str) -> List[str]:
     """
     Read an ArcGIS Web Map item and extract all operational layer URLs (and sublayers).
     """
-    try:
-        item_url = f"https://www.arcgis.com/sharing/rest/content/items/{item_id}/data"
-        r = requests.get(item_url, params={"f": "json"}, timeout=20)
-        r.raise_for_status()
-        data = r.json()
-        urls: List[str] = []
-        for lyr in (data.get("operationalLayers") or []):
-            if isinstance(lyr, dict):
-                if isinstance(lyr.get("url"), str):
-                    urls.append(lyr["url"])
-                for sl in (lyr.get("layers") or []):
-                    if isinstance(sl, dict) and isinstance(sl.get("url"), str):
-                        urls.append(sl["url"])
-        # dedupe while preserving order
-        return list(dict.fromkeys(urls))
-    except Exception:
-        return []
+    return _webmap_layer_urls(item_id)[0]
 
 
 def _get_renderer_for_layer(layer_url: str) -> Optional[Dict[str, Any]]:
     """
     Fetch the layer metadata and return drawingInfo.renderer if present.
     """
-    try:
-        r = requests.get(layer_url, params={"f": "pjson"}, timeout=15)
-        r.raise_for_status()
-        meta = r.json()
-        di = meta.get("drawingInfo") or {}
-        return di.get("renderer")
-    except Exception:
-        return None
+    meta = get_json(layer_url, params={"f": "pjson"}, timeout=15)
+    di = meta.get("drawingInfo") or {}
+    return di.get("renderer")
 
 
 def _feature_is_blue_green(attrs: Dict[str, Any], rule: Dict[str, Any]) -> bool:
@@ -178,12 +183,16 @@ def get_national_grid_feeders_near(lon: float, lat: float, radius_miles: float)
     """
     Backwards-compatible: return a pseudo-FeatureSet for pipeline integration.
     This function now gathers features from all HC layers in NG's web map.
+    "degraded" is True if the web map or any layer query failed / was short-circuited.
     """
-    features_all: Dict[str, Any] = {"features": []}
-    urls = _get_layer_urls_from_webmap(NG_WEBMAP_ITEM)
+    features_all: Dict[str, Any] = {"features": [], "degraded": False}
+    urls, degraded = _webmap_layer_urls(NG_WEBMAP_ITEM)
+    features_all["degraded"] = degraded
     for u in urls:
         try:
             res = query_point_buffer(u, lon, lat, radius_miles, out_fields="*")
+            if is_degraded(res):
+                features_all["degraded"] = True
             if isinstance(res, dict) and res.get("features"):
                 features_all["features"].extend(res["features"])
         except Exception:
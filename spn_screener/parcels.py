@@ -0,0 +1,301 @@
+# spn_screener/parcels.py
+# Compact, memory-mapped parcel footprint store built from county tax-parcel exports.
+# Replaces the square-by-acres proxy with the real parcel polygon wherever one contains the listing point.
+#
+# File layout (little-endian, every section 8-byte aligned):
+#   header            magic "SPNPARC1", counts, grid origin / cell size / dims, section offsets
+#   bbox              float64[n_parcels * 4]        (min_lon, min_lat, max_lon, max_lat)
+#   acres             float32[n_parcels]
+#   parcel_polys      int64[n_parcels + 1]          -> index into poly_rings
+#   poly_rings        int64[n_polys + 1]            -> index into ring_coords (first ring = exterior)
+#   ring_coords       int64[n_rings + 1]            -> index into coords (vertex pairs)
+#   coords            int32[n_coords * 2]           lon/lat in 1e-7 degrees (~1 cm)
+#   grid_cells        int64[nx * ny + 1]            -> index into grid_ids (uniform-grid spatial index)
+#   grid_ids          int32[n_grid_entries]         parcel ids overlapping each cell
+# Reading only maps the file; nothing is parsed up front, so opening a statewide store is instant.
+
+import json
+import math
+import mmap
+import os
+import shutil
+import struct
+import sys
+import threading
+from array import array
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple
+
+MAGIC = b"SPNPARC1"
+_HEADER = struct.Struct("<8s5q3d2q9q")   # magic, counts(5), lon0/lat0/cell_deg, nx/ny, 9 section offsets
+_SCALE = 1e7
+_SECTIONS = ("bbox", "acres", "parcel_polys", "poly_rings", "ring_coords", "coords", "grid_cells", "grid_ids")
+
+
+# ---------- Build ----------
+def _dp_simplify(ring: List[Tuple[float, float]], tol: float) -> List[Tuple[float, float]]:
+    """Douglas–Peucker on a closed ring; keeps at least a triangle."""
+    if tol <= 0 or len(ring) <= 4:
+        return ring
+    keep = [False] * len(ring)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(ring) - 1)]
+    while stack:
+        a, b = stack.pop()
+        (ax, ay), (bx, by) = ring[a], ring[b]
+        dx, dy = bx - ax, by - ay
+        norm = math.hypot(dx, dy)
+        best, idx = -1.0, -1
+        for i in range(a + 1, b):
+            px, py = ring[i]
+            d = abs(dy * (px - ax) - dx * (py - ay)) / norm if norm else math.hypot(px - ax, py - ay)
+            if d > best:
+                best, idx = d, i
+        if idx >= 0 and best > tol:
+            keep[idx] = True
+            stack.append((a, idx))
+            stack.append((idx, b))
+    out = [p for p, k in zip(ring, keep) if k]
+    return out if len(out) >= 4 else ring
+
+
+def _ring_area_deg2(ring: Sequence[Tuple[float, float]]) -> float:
+    return 0.5 * sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(ring, ring[1:]))
+
+
+def _polygons_of(geom: Dict[str, Any]) -> List[List[List[Tuple[float, float]]]]:
+    if not geom:
+        return []
+    if geom.get("type") == "Polygon":
+        polys = [geom["coordinates"]]
+    elif geom.get("type") == "MultiPolygon":
+        polys = geom["coordinates"]
+    else:
+        return []
+    return [[[(float(x), float(y)) for x, y, *_ in ring] for ring in poly if len(ring) >= 4] for poly in polys]
+
+
+def _iter_geometries(path: str) -> Iterable[Dict[str, Any]]:
+    """GeoJSON is read directly (must be lon/lat); other formats (shapefile, GPKG) go through geopandas."""
+    if path.lower().endswith((".geojson", ".json")):
+        with open(path) as f:
+            data = json.load(f)
+        for feat in data.get("features", []):
+            yield feat.get("geometry") or {}
+    else:
+        import geopandas as gpd
+        gdf = gpd.read_file(path)
+        if gdf.crs is not None:
+            gdf = gdf.to_crs(4326)
+        for geom in gdf.geometry:
+            if geom is not None:
+                yield geom.__geo_interface__
+
+
+def _write_array(f, arr: array) -> None:
+    """Write an array in the file's little-endian layout."""
+    if sys.byteorder == "big":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    arr.tofile(f)
+
+
+def build_parcel_store(sources: Iterable[str], out_path: str, simplify_m: float = 1.0,
+                       cell_deg: float = 0.01) -> int:
+    """
+    Build a parcel store from county exports (GeoJSON in lon/lat, or anything geopandas reads).
+    Rings are simplified to simplify_m meters; returns the number of parcels written.
+    Parcels are packed into typed arrays as they are read and coordinates are spilled to a
+    temporary file, so a statewide build never holds all geometries as Python objects.
+    """
+    tol = simplify_m / 111_139.0
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    tmp, coords_tmp = out_path + ".tmp", out_path + ".coords.tmp"
+
+    bbox, acres = array("d"), array("f")
+    parcel_polys, poly_rings, ring_coords = array("q", [0]), array("q", [0]), array("q", [0])
+    n_coords = 0
+    try:
+        with open(coords_tmp, "wb") as cf:
+            buf = array("i")
+            for src in sources:
+                for geom in _iter_geometries(src):
+                    polys = [[_dp_simplify(r, tol) for r in poly] for poly in _polygons_of(geom)]
+                    polys = [p for p in polys if p]
+                    if not polys:
+                        continue
+                    x0 = y0 = math.inf
+                    x1 = y1 = -math.inf
+                    for poly in polys:
+                        for ring in poly:
+                            for x, y in ring:
+                                buf.append(round(x * _SCALE))
+                                buf.append(round(y * _SCALE))
+                                x0, y0, x1, y1 = min(x0, x), min(y0, y), max(x1, x), max(y1, y)
+                            n_coords += len(ring)
+                            ring_coords.append(n_coords)
+                        poly_rings.append(len(ring_coords) - 1)
+                    parcel_polys.append(len(poly_rings) - 1)
+                    bbox.extend((x0, y0, x1, y1))
+                    # VERY rough area in degrees → acres, same convention as wetlands._acre_area
+                    area = sum(abs(_ring_area_deg2(poly[0])) - sum(abs(_ring_area_deg2(h)) for h in poly[1:])
+                               for poly in polys)
+                    acres.append(area * (111139 ** 2) / 4046.856)
+                    if len(buf) >= 1 << 20:
+                        _write_array(cf, buf)
+                        buf = array("i")
+            _write_array(cf, buf)
+        n_parcels = len(acres)
+
+        # Uniform grid index over the data extent, as a two-pass counting sort of parcel ids by cell
+        if n_parcels:
+            lon0, lat0 = min(bbox[0::4]), min(bbox[1::4])
+            nx = int((max(bbox[2::4]) - lon0) / cell_deg) + 1
+            ny = int((max(bbox[3::4]) - lat0) / cell_deg) + 1
+        else:
+            lon0 = lat0 = 0.0
+            nx = ny = 1
+
+        def cells_of(pid: int) -> Iterable[int]:
+            x0, y0, x1, y1 = bbox[pid * 4:pid * 4 + 4]
+            for cy in range(int((y0 - lat0) / cell_deg), int((y1 - lat0) / cell_deg) + 1):
+                for cx in range(int((x0 - lon0) / cell_deg), int((x1 - lon0) / cell_deg) + 1):
+                    yield cy * nx + cx
+
+        grid_cells = array("q", bytes(8 * (nx * ny + 1)))
+        for pid in range(n_parcels):
+            for c in cells_of(pid):
+                grid_cells[c + 1] += 1
+        for c in range(nx * ny):
+            grid_cells[c + 1] += grid_cells[c]
+        grid_ids = array("i", bytes(4 * grid_cells[-1]))
+        fill = array("q", grid_cells[:-1])
+        for pid in range(n_parcels):
+            for c in cells_of(pid):
+                grid_ids[fill[c]] = pid
+                fill[c] += 1
+        del fill
+
+        sections = [bbox, acres, parcel_polys, poly_rings, ring_coords, None, grid_cells, grid_ids]
+        sizes = [n_coords * 8 if a is None else len(a) * a.itemsize for a in sections]
+        offsets, pos = [], _HEADER.size
+        for size in sizes:
+            pos += -pos % 8
+            offsets.append(pos)
+            pos += size
+        offsets.append(pos)   # end of file
+        header = _HEADER.pack(MAGIC, n_parcels, len(poly_rings) - 1, len(ring_coords) - 1, n_coords,
+                              len(grid_ids), lon0, lat0, cell_deg, nx, ny, *offsets)
+
+        with open(tmp, "wb") as f:
+            f.write(header)
+            for off, a in zip(offsets, sections):
+                f.write(b"\0" * (off - f.tell()))
+                if a is None:
+                    with open(coords_tmp, "rb") as cf:
+                        shutil.copyfileobj(cf, f, 1 << 22)
+                else:
+                    _write_array(f, a)
+        os.replace(tmp, out_path)
+    finally:
+        for path in (coords_tmp, tmp):
+            if os.path.exists(path):
+                os.remove(path)
+    return n_parcels
+
+
+# ---------- Read ----------
+def _point_in_rings(x: int, y: int, rings: List[memoryview]) -> bool:
+    """Even-odd test over all rings of a polygon (holes toggle back out)."""
+    inside = False
+    for ring in rings:
+        n = len(ring) // 2
+        j = n - 1
+        for i in range(n):
+            xi, yi, xj, yj = ring[2 * i], ring[2 * i + 1], ring[2 * j], ring[2 * j + 1]
+            if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+                inside = not inside
+            j = i
+    return inside
+
+
+class ParcelStore:
+    """Read-only, memory-mapped view of a file written by build_parcel_store()."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "rb")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.n_parcels, _n_polys, _n_rings, _n_coords, _n_ids,
+         self.lon0, self.lat0, self.cell_deg, self.nx, self.ny, *offsets) = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a parcel store")
+        view = memoryview(self._mm)
+        fmt = {"bbox": "d", "acres": "f", "coords": "i", "grid_ids": "i"}
+        for name, a, b in zip(_SECTIONS, offsets, offsets[1:]):
+            end = a + (b - a) - ((b - a) % struct.calcsize(fmt.get(name, "q")))
+            setattr(self, f"_{name}", view[a:end].cast(fmt.get(name, "q")))
+
+    def _candidates(self, lon: float, lat: float) -> Sequence[int]:
+        cx = int((lon - self.lon0) / self.cell_deg)
+        cy = int((lat - self.lat0) / self.cell_deg)
+        if not (0 <= cx < self.nx and 0 <= cy < self.ny):
+            return ()
+        c = cy * self.nx + cx
+        return self._grid_ids[self._grid_cells[c]:self._grid_cells[c + 1]]
+
+    def _polys(self, pid: int) -> List[List[memoryview]]:
+        out = []
+        for p in range(self._parcel_polys[pid], self._parcel_polys[pid + 1]):
+            out.append([self._coords[2 * self._ring_coords[r]:2 * self._ring_coords[r + 1]]
+                        for r in range(self._poly_rings[p], self._poly_rings[p + 1])])
+        return out
+
+    def parcel_at(self, lon: float, lat: float) -> Optional[int]:
+        """Id of the parcel containing the point, or None."""
+        x, y = round(lon * _SCALE), round(lat * _SCALE)
+        for pid in self._candidates(lon, lat):
+            b = self._bbox[pid * 4:pid * 4 + 4]
+            if not (b[0] <= lon <= b[2] and b[1] <= lat <= b[3]):
+                continue
+            if any(_point_in_rings(x, y, rings) for rings in self._polys(pid)):
+                return pid
+        return None
+
+    def geometry(self, pid: int) -> Dict[str, Any]:
+        """GeoJSON Polygon / MultiPolygon for a parcel id."""
+        polys = [[[[ring[2 * i] / _SCALE, ring[2 * i + 1] / _SCALE] for i in range(len(ring) // 2)]
+                  for ring in rings] for rings in self._polys(pid)]
+        if len(polys) == 1:
+            return {"type": "Polygon", "coordinates": polys[0]}
+        return {"type": "MultiPolygon", "coordinates": polys}
+
+    def acres(self, pid: int) -> float:
+        return float(self._acres[pid])
+
+    def footprints(self, lons: Sequence[float], lats: Sequence[float]) -> List[Optional[Dict[str, Any]]]:
+        """Bulk lookup: the containing parcel's GeoJSON for each point (None where no parcel is found)."""
+        out: List[Optional[Dict[str, Any]]] = []
+        for lon, lat in zip(lons, lats):
+            pid = self.parcel_at(lon, lat)
+            out.append(self.geometry(pid) if pid is not None else None)
+        return out
+
+    def close(self) -> None:
+        for name in _SECTIONS:
+            getattr(self, f"_{name}").release()
+        self._mm.close()
+        self._f.close()
+
+
+_STORES: Dict[str, ParcelStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def open_parcel_store(path: str) -> Optional[ParcelStore]:
+    """Process-wide store for path; None if path is empty or missing."""
+    if not path or not os.path.exists(path):
+        return None
+    with _STORES_LOCK:
+        if path not in _STORES:
+            _STORES[path] = ParcelStore(path)
+        return _STORES[path]
@@ -1,22 +1,15 @@
-# spn_screener/pipeline.py — clean version with skip-remote + size-by-acres footprint
+# spn_screener/pipeline.py — clean version with skip-remote + parcel (or size-by-acres) footprint
+# Stage modules (wetlands -> shapely, hosting capacity / boundaries -> requests) are
+# imported inside the stages that use them, so `import spn_screener.pipeline` stays cheap
+# for CLI batch jobs and offline (SPN_SKIP_REMOTE) runs.
 import os
 import csv
 import math
 from dataclasses import dataclass, asdict
-from typing import Dict, Any
-
-from .config import SEARCH_RADIUS_MILES, DC_PER_ACRE_KW, DC_AC_RATIO
-from .hosting_capacity import (
-    get_national_grid_feeders_near,
-    summarize_best_capacity,
-    has_blue_green_capacity_ng,
-)
-from .boundaries import lookup_municipality
-from .landcover import estimate_cleared_acres
-from .wetlands import wetlands_overlaps
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 
-# Read the env var set by the Streamlit checkbox in app.py
-SKIP_REMOTE = os.getenv("SPN_SKIP_REMOTE") == "1"
+from .config import Settings, load_settings
+from .landcover import estimate_cleared_acres
 
 
 @dataclass
@@ -39,6 +32,10 @@ class SiteResult:
     hc_feeder_best_mw: float
     decision: str
     notes: str
+    zoning_code_url: str = ""
+    zoning_solar_provisions: str = ""
+    degraded: str = ""
+    footprint_source: str = "square"
 
 
 def detect_utility(lon: float, lat: float) -> str:
@@ -50,6 +47,19 @@ def detect_utility(lon: float, lat: float) -> str:
     return "National Grid"
 
 
+def utility_from_hc(hc: Optional[Dict[str, Any]]) -> str:
+    """
+    Utility name(s) for a site from its HC lookup: the adapters that returned features nearby,
+    else the adapters whose territory covers it. Empty if there is nothing to go on.
+    """
+    if not hc:
+        return ""
+    candidates = list(hc.get("utilities") or [])
+    found = {f.get("utility") for f in hc.get("features", [])}
+    names = [u for u in candidates if u in found] or candidates
+    return ", ".join(names)
+
+
 def _square_polygon_by_acres(lon: float, lat: float, acres: float) -> Dict[str, Any]:
     """
     Build a rough square polygon centered at (lon, lat) with area ≈ acres.
@@ -75,7 +85,68 @@ def _square_polygon_by_acres(lon: float, lat: float, acres: float) -> Dict[str,
     }
 
 
-def process_row(row: Dict[str, Any]) -> SiteResult:
+@dataclass
+class EnrichedSite:
+    """
+    Everything the remote lookups told us about a listing, independent of scoring parameters.
+    Wetland geometries (DEC out to wetland_buffer_ft) and hosting-capacity features (at hc_radius_miles)
+    are kept so any buffer / radius / sizing scenario within them can be rescored without refetching.
+    None = stage skipped.
+    """
+    address: str
+    price_usd: float
+    acres: float
+    lat: float
+    lon: float
+    cleared_hint: str
+    utility: str
+    municipality: str
+    county: str
+    zoning_code_url: str
+    zoning_solar_provisions: str
+    parcel: Dict[str, Any]
+    wetlands: Optional[Dict[str, Any]] = None
+    hc: Optional[Dict[str, Any]] = None
+    hc_radius_miles: float = 0.0
+    footprint_source: str = "square"
+    wetland_buffer_ft: float = 0.0
+
+
+def parcel_footprints(points: List[Tuple[float, float]], acres: List[float],
+                      settings: Settings) -> List[Tuple[Dict[str, Any], str]]:
+    """
+    Footprint polygon + source ("parcel" / "square") for many (lon, lat) points at once:
+    the real parcel from the local parcel store when one contains the point, else the square proxy.
+    """
+    found: List[Optional[Dict[str, Any]]] = [None] * len(points)
+    if settings.parcel_store:
+        from .parcels import open_parcel_store
+        store = open_parcel_store(settings.parcel_store)
+        if store is not None:
+            found = store.footprints([p[0] for p in points], [p[1] for p in points])
+    return [(fp, "parcel") if fp else (_square_polygon_by_acres(lon, lat, ac), "square")
+            for fp, (lon, lat), ac in zip(found, points, acres)]
+
+
+def enrich_row(row: Dict[str, Any], settings: Optional[Settings] = None,
+               hc_radius_miles: Optional[float] = None,
+               footprint: Optional[Tuple[Dict[str, Any], str]] = None,
+               wetland_buffer_ft: Optional[float] = None) -> EnrichedSite:
+    """
+    Run the remote lookups for one input row. HC features are fetched out to hc_radius_miles
+    (default settings.search_radius_miles) and DEC wetlands out to wetland_buffer_ft beyond the
+    parcel (default settings.dec_adj_buffer_ft), so scenarios up to those can be scored offline.
+    `footprint` may carry a precomputed parcel_footprints() entry for this row.
+    """
+    settings = settings or load_settings()
+    hc_radius = settings.search_radius_miles if hc_radius_miles is None else hc_radius_miles
+    wet_buffer = settings.dec_adj_buffer_ft if wetland_buffer_ft is None else wetland_buffer_ft
+    # Rows the geocoder could not place get a clear error instead of a float('') failure
+    src = row.get("geocode_source")
+    if src in ("miss", "unavailable"):
+        raise ValueError(f"not geocoded ({src})")
+    if not str(row.get("lat") or "").strip() or not str(row.get("lon") or "").strip():
+        raise ValueError("not geocoded (no lat/lon; set AUTO_GEOCODE=1 or run scripts/geocode.py)")
     # Basic fields
     addr = f"{row['address']}, {row['city']}, {row['state']} {row['zip']}"
     price = float(row["price_usd"])
@@ -83,26 +154,106 @@ def process_row(row: Dict[str, Any]) -> SiteResult:
     lat = float(row["lat"])
     lon = float(row["lon"])
 
-    # Utility & municipality (lightweight)
+    # Utility & municipality (lightweight; municipality is a remote lookup)
     utility = detect_utility(lon, lat)
-    muni_info = lookup_municipality(lon, lat) or {}
-    municipality = muni_info.get("name", "") or ""
-    county = muni_info.get("county", "") or ""
+    muni_info: Dict[str, Any] = {}
+    if not settings.skip_remote:
+        from .boundaries import lookup_municipality
+        muni_info = lookup_municipality(lon, lat) or {}
 
-    # Cleared acres (heuristic, can be replaced with CDL/NLCD)
-    est_cleared = estimate_cleared_acres(acres, row.get("cleared_hint", ""))
+    # Zoning: code is fetched/indexed once per municipality
+    try:
+        from .zoning import code_url_for, solar_zoning_summary
+        zoning_url = code_url_for(muni_info, settings.zoning_code_urls)
+        zoning_solar = solar_zoning_summary(muni_info, allow_fetch=True,
+                                            urls_path=settings.zoning_code_urls,
+                                            cache_dir=settings.cache_dir)
+    except Exception:
+        zoning_url, zoning_solar = "", ""
 
-    # Parcel-like footprint sized by acres
-    parcel_poly = _square_polygon_by_acres(lon, lat, acres)
+    # Parcel footprint: real parcel from the local store, else a square sized by acres
+    if footprint is None:
+        footprint = parcel_footprints([(lon, lat)], [acres], settings)[0]
+    parcel_poly, footprint_source = footprint
+
+    wetlands = hc = None
+    if not settings.skip_remote:
+        # Wetlands: fail-soft; failed sources are listed in "degraded"
+        try:
+            from .wetlands import fetch_wetland_geometries
+            wetlands = fetch_wetland_geometries(parcel_poly, wet_buffer)
+        except Exception:
+            wetlands = {"dec": [], "nwi": [], "degraded": ["dec", "nwi"]}
 
-    # Wetlands: fail-soft or skip if offline
-    if not SKIP_REMOTE:
+        # Hosting capacity: every utility adapter covering the site, queried concurrently; fail-soft
         try:
-            wet = wetlands_overlaps(parcel_poly)
+            from .hc_adapters import get_scheduler
+            hc = get_scheduler(settings).features_near(lon, lat, hc_radius)
         except Exception:
-            wet = {"dec_wetlands_ac": 0.0, "dec_adjacent_area_ac": 0.0, "nwi_ac": 0.0}
-    else:
-        wet = {"dec_wetlands_ac": 0.0, "dec_adjacent_area_ac": 0.0, "nwi_ac": 0.0}
+            hc = {"features": [], "degraded": True}
+        # Skip-remote runs keep the detect_utility() placeholder
+        utility = utility_from_hc(hc) or utility
+
+    return EnrichedSite(
+        address=addr,
+        price_usd=price,
+        acres=acres,
+        lat=lat,
+        lon=lon,
+        cleared_hint=row.get("cleared_hint", "") or "",
+        utility=utility,
+        municipality=muni_info.get("name", "") or "",
+        county=muni_info.get("county", "") or "",
+        zoning_code_url=zoning_url,
+        zoning_solar_provisions=zoning_solar,
+        parcel=parcel_poly,
+        wetlands=wetlands,
+        hc=hc,
+        hc_radius_miles=hc_radius,
+        footprint_source=footprint_source,
+        wetland_buffer_ft=wet_buffer,
+    )
+
+
+def site_wetland_acres(site: EnrichedSite, adj_buffers_ft: List[float]) -> Dict[float, Dict[str, Any]]:
+    """Wetland overlap acres per DEC adjacent-area buffer (zeros when the stage was skipped/failed)."""
+    zero = {"dec_wetlands_ac": 0.0, "dec_adjacent_area_ac": 0.0, "nwi_ac": 0.0}
+    if site.wetlands is None:
+        return {b: dict(zero) for b in adj_buffers_ft}
+    degraded = list(site.wetlands.get("degraded") or [])
+    try:
+        from .wetlands import overlap_acres
+        acres = overlap_acres(site.parcel, site.wetlands, adj_buffers_ft)
+    except Exception:
+        acres, degraded = {b: dict(zero) for b in adj_buffers_ft}, ["dec", "nwi"]
+    return {b: {**acres[b], "degraded": degraded} for b in adj_buffers_ft}
+
+
+def score_site(site: EnrichedSite, settings: Optional[Settings] = None,
+               wet: Optional[Dict[str, Any]] = None) -> SiteResult:
+    """
+    Score an enriched site under settings (sizing, radius, buffer, thresholds). No remote calls.
+    `wet` may carry precomputed site_wetland_acres() output for settings.dec_adj_buffer_ft.
+    """
+    settings = settings or load_settings()
+    radius = settings.search_radius_miles
+    if site.hc is not None and radius > site.hc_radius_miles + 1e-9:
+        raise ValueError(f"search radius {radius} mi exceeds enriched radius {site.hc_radius_miles} mi")
+    buffer_ft = settings.dec_adj_buffer_ft
+    if site.wetlands is not None and buffer_ft > site.wetland_buffer_ft + 1e-9:
+        raise ValueError(f"DEC adjacent-area buffer {buffer_ft} ft exceeds enriched buffer {site.wetland_buffer_ft} ft")
+
+    # Cleared acres (heuristic, can be replaced with CDL/NLCD)
+    est_cleared = estimate_cleared_acres(site.acres, site.cleared_hint)
+
+    # Stages whose remote source failed or was short-circuited by a circuit breaker;
+    # their zeros are "unknown", not "none found".
+    degraded = []
+
+    if wet is None:
+        wet = site_wetland_acres(site, [settings.dec_adj_buffer_ft])[settings.dec_adj_buffer_ft]
+    if wet.get("degraded"):
+        degraded.append("wetlands")
 
     # Buildable acres = cleared minus wetlands overlaps (DEC + adjacent + NWI)
     wetlands_total = (wet.get("dec_wetlands_ac", 0.0)
@@ -111,59 +262,66 @@ def process_row(row: Dict[str, Any]) -> SiteResult:
     est_buildable = max(est_cleared - wetlands_total, 0.0)
 
     # DC/AC sizing
-    req_dc_kw = round(est_buildable * DC_PER_ACRE_KW, 0)
-    req_ac_mw = round(req_dc_kw / (DC_AC_RATIO * 1000.0), 3)
+    req_dc_kw = round(est_buildable * settings.dc_per_acre_kw, 0)
+    req_ac_mw = round(req_dc_kw / (settings.dc_ac_ratio * 1000.0), 3)
+
+    notes = []
+    # Informational notes: reported, but unlike `notes` they don't hold a site back from PASS
+    info = []
 
-    # Hosting capacity (National Grid): fail-soft or skip if offline
+    # Hosting capacity: features within the scenario radius
     best_mw = 0.0
-    if not SKIP_REMOTE:
-        try:
-            hc = get_national_grid_feeders_near(lon, lat, SEARCH_RADIUS_MILES)
-            best = summarize_best_capacity(hc) or (0.0, 0.0)
-            best_mw = float(best[0])
-        except Exception:
-            best_mw = 0.0
-    # Color-based potential capacity: any blue/green HC line within the radius?
-    try:
-        if has_blue_green_capacity_ng(lon, lat, SEARCH_RADIUS_MILES):
-            notes.append("Potential capacity: blue/green HC lines within 1.5 miles (National Grid).")
-    except Exception:
-        pass
+    if site.hc is not None:
+        radius_m = radius * 1609.344
+        near = [f for f in site.hc.get("features", []) if f.get("dist_m", 0.0) <= radius_m]
+        caps = [f["mw"] for f in near if f.get("mw") is not None]
+        best_mw = max(caps) if caps else 0.0
+        if site.hc.get("degraded"):
+            degraded.append("hosting_capacity")
+        # Color-based potential capacity: any blue/green HC line within the radius?
+        bg_utilities = sorted({f.get("utility") or "National Grid" for f in near if f.get("blue_green")})
+        if bg_utilities:
+            info.append(f"Potential capacity: blue/green HC lines within {radius:g} miles ({', '.join(bg_utilities)}).")
 
     # Decision logic
     decision = "PASS"
-    notes = []
 
-    if price > 5_000_000:
+    if site.price_usd > settings.max_price_usd:
         decision = "FAIL"
-        notes.append("Price over $5M.")
-    if acres < 5:
+        notes.append(f"Price over ${settings.max_price_usd / 1e6:g}M.")
+    if site.acres < settings.min_acres:
         decision = "FAIL"
-        notes.append("Acreage under 5.")
+        notes.append(f"Acreage under {settings.min_acres:g}.")
     # 750 kWdc threshold ≈ 1.875 acres at 400 kWdc/ac
-    if est_buildable * 400 < 750:
+    if est_buildable * settings.dc_per_acre_kw / 1000.0 < settings.min_dc_kw:
         decision = "FAIL"
-        notes.append("Buildable area < 1.875 acres for 750 kW DC.")
+        min_ac = settings.min_dc_kw * 1000.0 / settings.dc_per_acre_kw
+        notes.append(f"Buildable area < {min_ac:g} acres for {settings.min_dc_kw:g} kW DC.")
 
     # Capacity hint
     if best_mw < (req_ac_mw or 0.0):
         # Only downgrade to REVIEW if not already FAIL
         if decision == "PASS":
             decision = "REVIEW"
-        notes.append("Feeder hosting capacity may be insufficient within 1.5 miles.")
+        notes.append(f"Feeder hosting capacity may be insufficient within {radius:g} miles.")
+
+    if "wetlands" in degraded:
+        notes.append("Wetlands lookup degraded (" + ", ".join(wet.get("degraded") or []) + " unavailable); overlap not verified.")
+    if "hosting_capacity" in degraded:
+        notes.append("Hosting capacity lookup degraded (utility GIS unavailable); capacity not verified.")
 
     if decision == "PASS" and notes:
         decision = "REVIEW"
 
     return SiteResult(
-        address=addr,
-        price_usd=price,
-        acres=acres,
-        lat=lat,
-        lon=lon,
-        utility=utility,
-        municipality=municipality,
-        county=county,
+        address=site.address,
+        price_usd=site.price_usd,
+        acres=site.acres,
+        lat=site.lat,
+        lon=site.lon,
+        utility=site.utility,
+        municipality=site.municipality,
+        county=site.county,
         est_cleared_acres=round(est_cleared, 2),
         dec_wetlands_ac=round(wet.get("dec_wetlands_ac", 0.0), 2),
         dec_adjacent_area_ac=round(wet.get("dec_adjacent_area_ac", 0.0), 2),
@@ -173,31 +331,72 @@ def process_row(row: Dict[str, Any]) -> SiteResult:
         req_ac_mw=req_ac_mw,
         hc_feeder_best_mw=best_mw,
         decision=decision,
-        notes="; ".join(notes),
+        notes="; ".join(info + notes),
+        zoning_code_url=site.zoning_code_url,
+        zoning_solar_provisions=site.zoning_solar_provisions,
+        degraded=";".join(degraded),
+        footprint_source=site.footprint_source,
     )
 
 
-def run_pipeline(csv_in: str, csv_out: str) -> None:
-    """
-    Read an input CSV of listings, score them, and write the output CSV.
-    """
+def process_row(row: Dict[str, Any], settings: Optional[Settings] = None) -> SiteResult:
+    """Enrich and score one listing."""
+    settings = settings or load_settings()
+    return score_site(enrich_row(row, settings), settings)
+
+
+def process_rows(rows: Iterable[Dict[str, Any]], settings: Settings) -> List[Dict[str, Any]]:
+    """Score each input row; a row that raises becomes {"address", "error"} instead of stopping the run."""
+    from .arcgis_utils import configure_health
+    configure_health(settings.breaker_failures, settings.breaker_cooldown_s)
+    rows = list(rows)
+    # Parcel footprints for the whole batch in one pass over the local store
+    points, acres, idx = [], [], {}
+    for i, r in enumerate(rows):
+        try:
+            point, ac = (float(r["lon"]), float(r["lat"])), float(r["acres"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        idx[i] = len(points)
+        points.append(point)
+        acres.append(ac)
+    footprints = parcel_footprints(points, acres, settings)
     rows_out = []
-    with open(csv_in, newline="") as f:
-        reader = csv.DictReader(f)
-        for r in reader:
-            try:
-                res = process_row(r)
-                rows_out.append(asdict(res))
-            except Exception as e:
-                rows_out.append({
-                    "address": f"{r.get('address', '')}",
-                    "error": str(e)
-                })
-
-    fieldnames = list(rows_out[0].keys()) if rows_out else []
-    os.makedirs(os.path.dirname(csv_out), exist_ok=True)
+    for i, r in enumerate(rows):
+        try:
+            fp = footprints[idx[i]] if i in idx else None
+            res = score_site(enrich_row(r, settings, footprint=fp), settings)
+            rows_out.append(asdict(res))
+        except Exception as e:
+            rows_out.append({
+                "address": f"{r.get('address', '')}",
+                "error": str(e)
+            })
+    return rows_out
+
+
+def write_rows(csv_out: str, rows_out: List[Dict[str, Any]], fieldnames: Optional[List[str]] = None) -> None:
+    """Write result dicts to CSV; columns default to the union of keys in first-seen order."""
+    if fieldnames is None:
+        fieldnames = list(dict.fromkeys(k for r in rows_out for k in r))
+    os.makedirs(os.path.dirname(csv_out) or ".", exist_ok=True)
     with open(csv_out, "w", newline="") as f:
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         writer.writeheader()
         writer.writerows(rows_out)
 
+
+def run_pipeline(csv_in: str, csv_out: str, settings: Optional[Settings] = None) -> None:
+    """
+    Read an input CSV of listings, score them, and write the output CSV.
+    Settings are resolved once per run (from the environment unless given).
+    """
+    settings = settings or load_settings()
+    with open(csv_in, newline="") as f:
+        rows = list(csv.DictReader(f))
+    if settings.auto_geocode:
+        # Address-only rows: resolve lat/lon for the whole file in one batch first
+        from .geocode import geocode_rows
+        geocode_rows(rows, settings)
+    rows_out = process_rows(rows, settings)
+    write_rows(csv_out, rows_out)
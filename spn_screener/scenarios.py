@@ -0,0 +1,169 @@
+# spn_screener/scenarios.py
+# Scenario sweeps: enrich listings once (remote lookups), persist the facts, then
+# rescore any number of parameter scenarios offline and compare the decisions.
+#
+#   enrich_file("listings.csv", "enriched.jsonl", settings, max_radius_miles=3.0, max_buffer_ft=150)
+#   rows = sweep(load_enriched("enriched.jsonl"), [{"name": "base"}, {"name": "dc350", "dc_per_acre_kw": 350_000}])
+
+import csv
+import itertools
+import json
+import os
+from dataclasses import asdict, replace
+from typing import Dict, Any, Iterable, List, Optional, Tuple, Union
+
+from .config import Settings, load_settings
+from .pipeline import EnrichedSite, enrich_row, score_site, site_wetland_acres, write_rows
+
+# Settings a scenario may change; all of them are applied at scoring time.
+SCENARIO_KEYS = (
+    "dc_per_acre_kw",
+    "dc_ac_ratio",
+    "search_radius_miles",
+    "dec_adj_buffer_ft",
+    "max_price_usd",
+    "min_acres",
+    "min_dc_kw",
+)
+
+# Per-scenario columns in the comparison table
+COMPARE_FIELDS = ("decision", "est_buildable_acres", "req_dc_kw", "req_ac_mw", "hc_feeder_best_mw", "notes")
+
+
+def enrich_file(csv_in: str, enriched_out: str, settings: Optional[Settings] = None,
+                max_radius_miles: Optional[float] = None, max_buffer_ft: Optional[float] = None) -> int:
+    """
+    Run the remote lookups for every row of csv_in and write one JSON object per line.
+    With settings.auto_geocode, address-only rows are geocoded in one batch first (as run_pipeline does).
+    HC features are fetched out to max_radius_miles (default settings.search_radius_miles) and
+    DEC wetlands out to max_buffer_ft (default settings.dec_adj_buffer_ft): the largest radius
+    and adjacent-area buffer any later scenario may use. Rows that fail carry an "error" key.
+    """
+    settings = settings or load_settings()
+    from .arcgis_utils import configure_health
+    configure_health(settings.breaker_failures, settings.breaker_cooldown_s)
+    with open(csv_in, newline="") as f:
+        rows = list(csv.DictReader(f))
+    if settings.auto_geocode:
+        from .geocode import geocode_rows
+        geocode_rows(rows, settings)
+    os.makedirs(os.path.dirname(enriched_out) or ".", exist_ok=True)
+    n = 0
+    with open(enriched_out, "w") as out:
+        for r in rows:
+            try:
+                rec = asdict(enrich_row(r, settings, max_radius_miles, wetland_buffer_ft=max_buffer_ft))
+            except Exception as e:
+                rec = {"address": f"{r.get('address', '')}", "error": str(e)}
+            out.write(json.dumps(rec) + "\n")
+            n += 1
+    return n
+
+
+def load_enriched(path: str) -> List[Union[EnrichedSite, Dict[str, Any]]]:
+    """Read enrich_file() output; failed rows stay plain dicts with an "error" key."""
+    sites: List[Union[EnrichedSite, Dict[str, Any]]] = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                rec = json.loads(line)
+                sites.append(rec if "error" in rec else EnrichedSite(**rec))
+    return sites
+
+
+def scenario_settings(base: Settings, scenario: Dict[str, Any]) -> Settings:
+    """Apply a scenario's overrides (anything but "name") to base settings."""
+    overrides = {k: v for k, v in scenario.items() if k != "name"}
+    unknown = set(overrides) - set(SCENARIO_KEYS)
+    if unknown:
+        raise ValueError(f"unknown scenario keys: {sorted(unknown)} (allowed: {', '.join(SCENARIO_KEYS)})")
+    return replace(base, **{k: float(v) for k, v in overrides.items()})
+
+
+def grid_scenarios(grid: Dict[str, Iterable[Any]]) -> List[Dict[str, Any]]:
+    """Cartesian product of parameter values, e.g. {"dc_ac_ratio": [1.2, 1.3]} -> named scenarios."""
+    keys = list(grid)
+    out = []
+    for values in itertools.product(*(list(grid[k]) for k in keys)):
+        sc = dict(zip(keys, values))
+        sc["name"] = ",".join(f"{k}={v}" for k, v in sc.items())
+        out.append(sc)
+    return out
+
+
+def check_scenarios(sites: List[Union[EnrichedSite, Dict[str, Any]]],
+                    named: List[Tuple[str, Settings]]) -> None:
+    """
+    Raise ValueError naming every scenario whose search radius or DEC buffer exceeds what the
+    sites were enriched with (score_site would reject it), before any scoring starts.
+    """
+    enriched = [s for s in sites if isinstance(s, EnrichedSite)]
+    radii = [s.hc_radius_miles for s in enriched if s.hc is not None]
+    buffers = [s.wetland_buffer_ft for s in enriched if s.wetlands is not None]
+    max_radius = min(radii) if radii else None
+    max_buffer = min(buffers) if buffers else None
+    problems = []
+    for name, s in named:
+        if max_radius is not None and s.search_radius_miles > max_radius + 1e-9:
+            problems.append(f"{name} (search_radius_miles {s.search_radius_miles:g} > enriched {max_radius:g})")
+        if max_buffer is not None and s.dec_adj_buffer_ft > max_buffer + 1e-9:
+            problems.append(f"{name} (dec_adj_buffer_ft {s.dec_adj_buffer_ft:g} > enriched {max_buffer:g})")
+    if problems:
+        raise ValueError("scenarios exceed the enriched limits; re-enrich with a larger "
+                         "--max-radius / --max-buffer: " + "; ".join(problems))
+
+
+def sweep(sites: List[Union[EnrichedSite, Dict[str, Any]]], scenarios: List[Dict[str, Any]],
+          base: Optional[Settings] = None) -> List[Dict[str, Any]]:
+    """
+    Score every site under every scenario. Returns a wide comparison table: one row per site,
+    with "<scenario>:<field>" columns for each field in COMPARE_FIELDS.
+    Wetland overlays are computed once per site for each distinct buffer across all scenarios.
+    Raises ValueError up front if any scenario exceeds the enriched radius / buffer (check_scenarios).
+    """
+    base = base or load_settings()
+    named = [(sc.get("name") or f"s{i}", scenario_settings(base, sc)) for i, sc in enumerate(scenarios)]
+    if len({n for n, _ in named}) != len(named):
+        raise ValueError("scenario names must be unique")
+    check_scenarios(sites, named)
+    buffers = sorted({s.dec_adj_buffer_ft for _, s in named})
+
+    rows = []
+    for site in sites:
+        if isinstance(site, dict):
+            rows.append({"address": site.get("address", ""), "error": site.get("error", "")})
+            continue
+        row: Dict[str, Any] = {"address": site.address, "municipality": site.municipality,
+                               "price_usd": site.price_usd, "acres": site.acres}
+        wet_by_buffer = site_wetland_acres(site, buffers)
+        for name, s in named:
+            res = asdict(score_site(site, s, wet_by_buffer[s.dec_adj_buffer_ft]))
+            for field in COMPARE_FIELDS:
+                row[f"{name}:{field}"] = res[field]
+        rows.append(row)
+    return rows
+
+
+def summarize_sweep(rows: List[Dict[str, Any]], scenarios: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Per-scenario decision counts and total required AC MW of non-FAIL sites."""
+    out = []
+    for i, sc in enumerate(scenarios):
+        name = sc.get("name") or f"s{i}"
+        counts = {"PASS": 0, "REVIEW": 0, "FAIL": 0}
+        mw = 0.0
+        for r in rows:
+            d = r.get(f"{name}:decision")
+            if d in counts:
+                counts[d] += 1
+                if d != "FAIL":
+                    mw += float(r.get(f"{name}:req_ac_mw") or 0.0)
+        out.append({"scenario": name, **counts, "non_fail_req_ac_mw": round(mw, 3)})
+    return out
+
+
+def sweep_file(enriched_path: str, scenarios: List[Dict[str, Any]], csv_out: str,
+               base: Optional[Settings] = None) -> List[Dict[str, Any]]:
+    """Load enriched sites, run the sweep, write the comparison CSV; returns the summary."""
+    rows = sweep(load_enriched(enriched_path), scenarios, base)
+    write_rows(csv_out, rows)
+    return summarize_sweep(rows, scenarios)
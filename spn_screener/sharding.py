@@ -0,0 +1,245 @@
+# spn_screener/sharding.py
+# Sharded batch runs for large (statewide) listing feeds.
+#
+#   plan  -> split the input CSV by spatial tile into N shard CSVs + manifest.json
+#   run   -> score shards independently (processes here, or other machines sharing work_dir)
+#   merge -> combine shard outputs back into the original row order
+#
+# Rows in the same tile go to the same shard, so nearby listings hit the same
+# per-process caches (layer metadata, zoning codes) and the shared cache directory.
+
+import csv
+import hashlib
+import json
+import math
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+from .config import Settings, load_settings
+
+ROW_ID = "_row_id"
+MANIFEST = "manifest.json"
+
+
+def _tile_key(row: Dict[str, Any], tile_deg: float) -> Tuple[int, int]:
+    """Grid cell for a row; rows without usable coordinates share one cell."""
+    try:
+        lat, lon = float(row["lat"]), float(row["lon"])
+    except (KeyError, TypeError, ValueError):
+        return (-10**9, -10**9)
+    if math.isnan(lat) or math.isnan(lon):
+        return (-10**9, -10**9)
+    return (math.floor(lat / tile_deg), math.floor(lon / tile_deg))
+
+
+def _manifest_path(work_dir: str) -> str:
+    return os.path.join(work_dir, MANIFEST)
+
+
+def source_fingerprint(csv_in: str) -> Dict[str, Any]:
+    """
+    Size and SHA-256 of the input CSV, so a re-exported feed at the same path is detected.
+    The path is recorded for reference only; the same content on another mount or machine matches.
+    """
+    h = hashlib.sha256()
+    with open(csv_in, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return {"path": os.path.abspath(csv_in), "size": os.path.getsize(csv_in), "sha256": h.hexdigest()}
+
+
+def plan_matches(manifest: Dict[str, Any], csv_in: str, n_shards: int, tile_deg: float) -> bool:
+    """Whether an existing plan was made from this exact input with the same shard parameters."""
+    return (
+        _same_content(manifest.get("source"), source_fingerprint(csv_in))
+        and manifest.get("requested_shards") == n_shards
+        and manifest.get("tile_deg") == tile_deg
+    )
+
+
+def _same_content(a: Any, b: Dict[str, Any]) -> bool:
+    return isinstance(a, dict) and a.get("size") == b["size"] and a.get("sha256") == b["sha256"]
+
+
+def load_manifest(work_dir: str) -> Dict[str, Any]:
+    with open(_manifest_path(work_dir)) as f:
+        return json.load(f)
+
+
+def plan_shards(csv_in: str, work_dir: str, n_shards: int, tile_deg: float = 0.1) -> Dict[str, Any]:
+    """
+    Partition csv_in into n_shards shard CSVs under work_dir/shards by spatial tile.
+    Tiles are assigned largest-first to the least-loaded shard, so the plan is
+    deterministic for a given input. Each shard row carries its original _row_id.
+    """
+    with open(csv_in, newline="") as f:
+        reader = csv.DictReader(f)
+        fieldnames = list(reader.fieldnames or [])
+        rows = list(reader)
+
+    tiles: Dict[Tuple[int, int], List[int]] = {}
+    for i, r in enumerate(rows):
+        tiles.setdefault(_tile_key(r, tile_deg), []).append(i)
+
+    requested = n_shards
+    n_shards = max(1, min(n_shards, len(tiles) or 1))
+    loads = [0] * n_shards
+    assigned: List[List[int]] = [[] for _ in range(n_shards)]
+    for key in sorted(tiles, key=lambda k: (-len(tiles[k]), k)):
+        target = min(range(n_shards), key=lambda s: (loads[s], s))
+        assigned[target].extend(tiles[key])
+        loads[target] += len(tiles[key])
+
+    os.makedirs(os.path.join(work_dir, "shards"), exist_ok=True)
+    os.makedirs(os.path.join(work_dir, "out"), exist_ok=True)
+    # A new plan invalidates outputs from any previous plan in this work_dir
+    for d in ("shards", "out"):
+        for name in os.listdir(os.path.join(work_dir, d)):
+            os.remove(os.path.join(work_dir, d, name))
+    shards = []
+    for s, ids in enumerate(assigned):
+        shard_in = os.path.join("shards", f"shard-{s:04d}.csv")
+        with open(os.path.join(work_dir, shard_in), "w", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=[ROW_ID] + fieldnames)
+            w.writeheader()
+            for i in ids:
+                w.writerow({ROW_ID: i, **rows[i]})
+        shards.append({
+            "index": s,
+            "input": shard_in,
+            "output": os.path.join("out", f"shard-{s:04d}.csv"),
+            "n_rows": len(ids),
+        })
+
+    manifest = {
+        "source": source_fingerprint(csv_in),
+        "n_rows": len(rows),
+        "requested_shards": requested,
+        "tile_deg": tile_deg,
+        "shards": shards,
+    }
+    tmp = _manifest_path(work_dir) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, _manifest_path(work_dir))
+    return manifest
+
+
+def _failed_marker(work_dir: str, shard: Dict[str, Any]) -> str:
+    return os.path.join(work_dir, shard["output"] + ".failed")
+
+
+def run_shard(work_dir: str, index: int, settings: Optional[Settings] = None) -> int:
+    """
+    Score one shard and write its output atomically (the output file exists only once complete).
+    On an unexpected error a <output>.failed file records the traceback. Returns rows written.
+    """
+    from .pipeline import process_rows, write_rows
+
+    settings = settings or load_settings()
+    shard = load_manifest(work_dir)["shards"][index]
+    out_path = os.path.join(work_dir, shard["output"])
+    failed = _failed_marker(work_dir, shard)
+    try:
+        with open(os.path.join(work_dir, shard["input"]), newline="") as f:
+            rows = list(csv.DictReader(f))
+        results = process_rows(rows, settings)
+        rows_out = [{ROW_ID: r[ROW_ID], **res} for r, res in zip(rows, results)]
+        tmp = out_path + f".tmp-{os.getpid()}"
+        write_rows(tmp, rows_out)
+        os.replace(tmp, out_path)
+    except Exception:
+        with open(failed, "w") as f:
+            f.write(traceback.format_exc())
+        raise
+    if os.path.exists(failed):
+        os.remove(failed)
+    return len(rows_out)
+
+
+def shard_status(work_dir: str) -> Dict[str, List[int]]:
+    """Shard indexes grouped as done / failed / pending, from the files in work_dir."""
+    status: Dict[str, List[int]] = {"done": [], "failed": [], "pending": []}
+    for shard in load_manifest(work_dir)["shards"]:
+        if os.path.exists(os.path.join(work_dir, shard["output"])):
+            status["done"].append(shard["index"])
+        elif os.path.exists(_failed_marker(work_dir, shard)):
+            status["failed"].append(shard["index"])
+        else:
+            status["pending"].append(shard["index"])
+    return status
+
+
+def merge_shards(work_dir: str, csv_out: str) -> int:
+    """
+    Merge completed shard outputs into csv_out in the original input row order.
+    Raises RuntimeError if any shard has not finished. Returns rows written.
+    """
+    from .pipeline import write_rows
+
+    manifest = load_manifest(work_dir)
+    status = shard_status(work_dir)
+    missing = status["failed"] + status["pending"]
+    if missing:
+        raise RuntimeError(f"cannot merge: shards not finished: {sorted(missing)}")
+
+    merged: List[Dict[str, Any]] = []
+    for shard in manifest["shards"]:
+        with open(os.path.join(work_dir, shard["output"]), newline="") as f:
+            merged.extend(csv.DictReader(f))
+    merged.sort(key=lambda r: int(r[ROW_ID]))
+    if len(merged) != manifest["n_rows"]:
+        raise RuntimeError(f"cannot merge: expected {manifest['n_rows']} rows, found {len(merged)}")
+
+    # Shard CSVs may have different column sets (e.g. an "error" column); use the
+    # SiteResult columns then any extras, so the header doesn't depend on the sharding.
+    from .pipeline import SiteResult
+    for r in merged:
+        r.pop(ROW_ID)
+    base = list(SiteResult.__dataclass_fields__)
+    extras = sorted({k for r in merged for k in r} - set(base))
+    write_rows(csv_out, merged, base + extras)
+    return len(merged)
+
+
+def _run_shard_worker(args: Tuple[str, int, Settings]) -> int:
+    work_dir, index, settings = args
+    return run_shard(work_dir, index, settings)
+
+
+def run_sharded(csv_in: str, csv_out: str, work_dir: str, n_shards: int, workers: Optional[int] = None,
+                retries: int = 2, tile_deg: float = 0.1, settings: Optional[Settings] = None) -> Dict[str, List[int]]:
+    """
+    Plan (unless work_dir already holds a plan for this exact csv_in content, shard count and
+    tile size), run every unfinished shard across local processes, retry failed shards up to
+    `retries` times, then merge. Re-running after a crash only redoes the shards without output;
+    a changed input or plan parameters trigger a fresh plan (and discard old shard outputs).
+    """
+    settings = settings or load_settings()
+    try:
+        replan = not plan_matches(load_manifest(work_dir), csv_in, n_shards, tile_deg)
+    except (FileNotFoundError, ValueError):
+        replan = True
+    if replan:
+        plan_shards(csv_in, work_dir, n_shards, tile_deg)
+
+    for _ in range(retries + 1):
+        status = shard_status(work_dir)
+        todo = status["failed"] + status["pending"]
+        if not todo:
+            break
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_run_shard_worker, (work_dir, i, settings)) for i in sorted(todo)]
+            for fut in futures:
+                try:
+                    fut.result()
+                except Exception:
+                    # recorded in the shard's .failed marker; retried on the next pass
+                    pass
+
+    status = shard_status(work_dir)
+    if not (status["failed"] or status["pending"]):
+        merge_shards(work_dir, csv_out)
+    return status
@@ -1,36 +1,62 @@
-from typing import Dict, Any, Tuple
-from shapely.geometry import shape, mapping
-from shapely.ops import unary_union
-import shapely
-from .arcgis_utils import query_polygon_intersect
-from .config import ENDPOINTS, DEC_ADJ_BUFFER_FT
+from typing import Dict, Any, Iterable, Optional
+from .arcgis_utils import query_polygon_intersect, is_degraded, esri_to_geojson
+from .config import ENDPOINTS, load_settings
 
 def _acre_area(geom) -> float:
     return geom.area * (111139**2) / 4046.856e+0  # VERY rough if coords in degrees; replace with projected calc in production
 
-def wetlands_overlaps(polygon_geojson: Dict[str, Any]) -> Dict[str, float]:
-    """Return overlapping acres with DEC informational wetlands (plus 100ft adjacent area) and USFWS NWI polygons.
-    NOTE: In production, reproject to NYSP CS (ft) before buffering/areas.
+def fetch_wetland_geometries(polygon_geojson: Dict[str, Any], adj_buffer_ft: float = 0.0) -> Dict[str, Any]:
+    """Fetch DEC informational and USFWS NWI wetland polygons (GeoJSON) intersecting a parcel.
+    DEC wetlands are fetched out to adj_buffer_ft beyond the parcel, so wetlands just outside it whose
+    adjacent area reaches in are included; overlap_acres() is valid for buffers up to that distance.
+    "degraded" lists the sources ("dec", "nwi") whose query failed, so an empty list there is unverified.
     """
-    parcel = shape(polygon_geojson)
-    out = {"dec_wetlands_ac": 0.0, "dec_adjacent_area_ac": 0.0, "nwi_ac": 0.0}
+    out: Dict[str, Any] = {"dec": [], "nwi": [], "degraded": []}
+    for source, endpoint in (("dec", "dec_wetlands_informational"), ("nwi", "nwi_wetlands")):
+        distance_m = adj_buffer_ft * 0.3048 if source == "dec" else 0.0
+        res = query_polygon_intersect(ENDPOINTS[endpoint], polygon_geojson, distance_m=distance_m)
+        if is_degraded(res):
+            out["degraded"].append(source)
+        for f in (res.get("features", []) if isinstance(res, dict) else []):
+            g = esri_to_geojson(f.get("geometry"))
+            if g:
+                out[source].append(g)
+    return out
 
-    # DEC informational wetlands
-    dec = query_polygon_intersect(ENDPOINTS["dec_wetlands_informational"], polygon_geojson)
-    dec_polys = [shape(f["geometry"]) for f in (dec.get("features", []) if isinstance(dec, dict) else []) if f.get("geometry")]
-    if dec_polys:
-        dec_union = unary_union(dec_polys)
-        out["dec_wetlands_ac"] = _acre_area(parcel.intersection(dec_union))
-        # adjacent area buffer (100 ft) – crude buffer in degrees, replace with projected buffer in production
-        ft_to_deg = 1/(3.28084*111139)  # very rough
-        adj = dec_union.buffer(DEC_ADJ_BUFFER_FT * ft_to_deg)
-        out["dec_adjacent_area_ac"] = _acre_area(parcel.intersection(adj))
+def overlap_acres(polygon_geojson: Dict[str, Any], geometries: Dict[str, Any],
+                  adj_buffers_ft: Iterable[float]) -> Dict[float, Dict[str, float]]:
+    """Overlap acres of a parcel with fetched wetland geometries, for each DEC adjacent-area buffer.
+    Unions are built once, so extra buffers only cost one buffer + intersection each.
+    """
+    # shapely is imported here so sizing-only / offline runs never load it
+    from shapely.geometry import shape
+    from shapely.ops import unary_union
+    parcel = shape(polygon_geojson)
+    dec_polys = [shape(g) for g in geometries.get("dec") or []]
+    nwi_polys = [shape(g) for g in geometries.get("nwi") or []]
+    dec_union = unary_union(dec_polys) if dec_polys else None
+    dec_ac = _acre_area(parcel.intersection(dec_union)) if dec_union is not None else 0.0
+    nwi_ac = _acre_area(parcel.intersection(unary_union(nwi_polys))) if nwi_polys else 0.0
 
-    # NWI
-    nwi = query_polygon_intersect(ENDPOINTS["nwi_wetlands"], polygon_geojson)
-    nwi_polys = [shape(f["geometry"]) for f in (nwi.get("features", []) if isinstance(nwi, dict) else []) if f.get("geometry")]
-    if nwi_polys:
-        nwi_union = unary_union(nwi_polys)
-        out["nwi_ac"] = _acre_area(parcel.intersection(nwi_union))
+    out: Dict[float, Dict[str, float]] = {}
+    for buf_ft in adj_buffers_ft:
+        adj_ac = 0.0
+        if dec_union is not None:
+            # adjacent area buffer (100 ft) – crude buffer in degrees, replace with projected buffer in production
+            ft_to_deg = 1/(3.28084*111139)  # very rough
+            adj = dec_union.buffer(buf_ft * ft_to_deg)
+            adj_ac = _acre_area(parcel.intersection(adj))
+        out[buf_ft] = {"dec_wetlands_ac": dec_ac, "dec_adjacent_area_ac": adj_ac, "nwi_ac": nwi_ac}
+    return out
 
+def wetlands_overlaps(polygon_geojson: Dict[str, Any], adj_buffer_ft: Optional[float] = None) -> Dict[str, Any]:
+    """Return overlapping acres with DEC informational wetlands (plus 100ft adjacent area) and USFWS NWI polygons.
+    "degraded" lists the sources ("dec", "nwi") whose query failed, so their 0 acres are unverified.
+    NOTE: In production, reproject to NYSP CS (ft) before buffering/areas.
+    """
+    if adj_buffer_ft is None:
+        adj_buffer_ft = load_settings().dec_adj_buffer_ft
+    geoms = fetch_wetland_geometries(polygon_geojson, adj_buffer_ft)
+    out: Dict[str, Any] = dict(overlap_acres(polygon_geojson, geoms, [adj_buffer_ft])[adj_buffer_ft])
+    out["degraded"] = geoms["degraded"]
     return out
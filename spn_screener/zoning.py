@@ -1,6 +1,10 @@
 # Zoning is decentralized; we use links + LLM summarization when a code URL is configured.
 # For now, we return placeholder URLs based on municipality name for eCode360 search patterns.
-from typing import Optional, Dict
+import csv
+import os
+from typing import Optional, Dict, Any
+
+from .config import load_settings
 
 def guess_zoning_links(municipality_name: str) -> Dict[str, str]:
     name = (municipality_name or "").strip().replace(" ", "+")
@@ -14,3 +18,50 @@ def summarize_code_text(text: str) -> str:
     if not text:
         return ""
     return text[:800] + ("..." if len(text) > 800 else "")
+
+_CODE_URLS: Dict[str, Dict[str, str]] = {}
+
+def load_code_urls(path: Optional[str] = None) -> Dict[str, str]:
+    """
+    Read the municipality -> code URL CSV (municipality, county, url). Keys match municipality_key().
+    path defaults to the current settings' zoning_code_urls.
+    """
+    from .zoning_store import municipality_key
+    if path is None:
+        path = load_settings().zoning_code_urls
+    out: Dict[str, str] = {}
+    if not path or not os.path.exists(path):
+        return out
+    with open(path, newline="") as f:
+        for r in csv.DictReader(f):
+            key = municipality_key({"name": r.get("municipality"), "county": r.get("county")})
+            if key and r.get("url"):
+                out[key] = r["url"].strip()
+    return out
+
+def code_url_for(muni_info: Optional[Dict[str, Any]], urls_path: Optional[str] = None) -> str:
+    from .zoning_store import municipality_key
+    path = load_settings().zoning_code_urls if urls_path is None else urls_path
+    if path not in _CODE_URLS:
+        _CODE_URLS[path] = load_code_urls(path)
+    return _CODE_URLS[path].get(municipality_key(muni_info), "")
+
+def solar_zoning_summary(muni_info: Optional[Dict[str, Any]], allow_fetch: bool = True,
+                         urls_path: Optional[str] = None, cache_dir: Optional[str] = None) -> str:
+    """
+    Short text of solar-related provisions (setbacks, lot coverage, special-use permits)
+    from the municipality's cached code. Empty if no code URL is configured/available.
+    """
+    url = code_url_for(muni_info, urls_path)
+    if not url:
+        return ""
+    from .zoning_store import get_store
+    store = get_store(os.path.join(cache_dir, "zoning_codes.sqlite") if cache_dir else None)
+    key = store.ensure(muni_info, url, allow_fetch=allow_fetch)
+    if not key:
+        return ""
+    parts = []
+    for topic, hits in store.solar_provisions(key, limit=1).items():
+        for h in hits:
+            parts.append(f"{topic}: {h['heading']} — {h['snippet']}".strip())
+    return summarize_code_text(" | ".join(parts))
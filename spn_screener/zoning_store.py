@@ -0,0 +1,235 @@
+# spn_screener/zoning_store.py
+# Local store of municipal zoning codes, indexed with SQLite FTS5.
+# Each municipality's code is fetched and parsed once, then solar-related
+# provisions (setbacks, lot coverage, special-use permits) are pulled out by query.
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from html.parser import HTMLParser
+from typing import Dict, Any, List, Optional
+
+from .config import load_settings
+
+# FTS5 queries for the provisions we care about when screening a solar site.
+SOLAR_TOPICS: Dict[str, str] = {
+    "setbacks": '(solar OR photovoltaic) AND (setback* OR "side yard" OR "front yard" OR "rear yard")',
+    "lot_coverage": '(solar OR photovoltaic) AND ("lot coverage" OR coverage)',
+    "special_use_permit": '(solar OR photovoltaic) AND ("special use" OR "special permit" OR "conditional use")',
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    muni_key   TEXT PRIMARY KEY,
+    name       TEXT,
+    county     TEXT,
+    url        TEXT,
+    fetched_at REAL,
+    n_sections INTEGER
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS sections USING fts5(
+    muni_key UNINDEXED,
+    heading,
+    body,
+    tokenize = 'porter unicode61'
+);
+"""
+
+# Lines that start a new code section (eCode360 / Municode style headings)
+_HEADING_RE = re.compile(r"^\s*(§\s*\d[\w.\-]*|Section\s+\d[\w.\-]*|ARTICLE\s+[IVXLC\d]+|Article\s+[IVXLC\d]+)\b.*$")
+_BLOCK_TAGS = {"p", "div", "br", "li", "h1", "h2", "h3", "h4", "h5", "h6", "tr", "section", "article"}
+
+
+class _TextExtractor(HTMLParser):
+    """Collect visible text from HTML, turning block elements into line breaks."""
+
+    def __init__(self):
+        super().__init__()
+        self.parts: List[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self._skip += 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style") and self._skip:
+            self._skip -= 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+
+def _html_to_text(html: str) -> str:
+    if "<" not in html:
+        return html
+    p = _TextExtractor()
+    p.feed(html)
+    return "".join(p.parts)
+
+
+def split_sections(text: str, max_chars: int = 4000) -> List[Dict[str, str]]:
+    """
+    Split a code document into {"heading", "body"} sections on § / Section / Article lines.
+    Very long sections are chunked so FTS snippets stay local to the match.
+    """
+    sections: List[Dict[str, str]] = []
+    heading, buf = "", []
+
+    def flush():
+        body = re.sub(r"[ \t]+", " ", "\n".join(buf)).strip()
+        for i in range(0, len(body), max_chars):
+            sections.append({"heading": heading, "body": body[i:i + max_chars]})
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if _HEADING_RE.match(line):
+            if buf:
+                flush()
+            heading, buf = line[:200], []
+        else:
+            buf.append(line)
+    if buf:
+        flush()
+    return sections
+
+
+def municipality_key(muni_info: Optional[Dict[str, Any]]) -> str:
+    """Stable key for a lookup_municipality() result: 'county|name', lowercased."""
+    muni_info = muni_info or {}
+    name = (muni_info.get("name") or "").strip().lower()
+    county = (muni_info.get("county") or "").strip().lower()
+    return f"{county}|{name}" if name else ""
+
+
+def _fetch_code_text(url: str) -> str:
+    import requests
+    r = requests.get(url, headers={"User-Agent": "SPN-Screener/0.1"}, timeout=30)
+    r.raise_for_status()
+    return r.text
+
+
+class ZoningCodeStore:
+    """
+    SQLite-backed cache of municipal code documents with an FTS5 section index.
+    Safe to share between processes pointing at the same cache directory, and between
+    threads (e.g. Streamlit reruns): each thread gets its own connection.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or _default_db_path()
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self._local = threading.local()
+        self._conns: List[tuple] = []   # (owning thread, connection)
+        self._conns_lock = threading.Lock()
+        self.conn.executescript(_SCHEMA)
+        # Fetch failures are only remembered for this process, so a later run can retry.
+        self._failed: Dict[str, str] = {}
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # check_same_thread=False only so connections can be closed from another thread;
+            # each connection is still used by the thread that opened it.
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self._local.conn = conn
+            with self._conns_lock:
+                # threads come and go (one per Streamlit rerun); drop connections of finished ones
+                dead = [c for t, c in self._conns if not t.is_alive()]
+                self._conns = [(t, c) for t, c in self._conns if t.is_alive()]
+                self._conns.append((threading.current_thread(), conn))
+            for c in dead:
+                c.close()
+        return conn
+
+    def has(self, key: str) -> bool:
+        row = self.conn.execute("SELECT 1 FROM documents WHERE muni_key = ?", (key,)).fetchone()
+        return row is not None
+
+    def add_document(self, muni_info: Dict[str, Any], url: str, text: str) -> int:
+        """Parse and index a code document, replacing any previous copy. Returns the section count."""
+        key = municipality_key(muni_info)
+        sections = split_sections(_html_to_text(text))
+        with self.conn:
+            self.conn.execute("DELETE FROM sections WHERE muni_key = ?", (key,))
+            self.conn.executemany(
+                "INSERT INTO sections (muni_key, heading, body) VALUES (?, ?, ?)",
+                [(key, s["heading"], s["body"]) for s in sections],
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?)",
+                (key, muni_info.get("name") or "", muni_info.get("county") or "", url, time.time(), len(sections)),
+            )
+        return len(sections)
+
+    def ensure(self, muni_info: Optional[Dict[str, Any]], url: str, allow_fetch: bool = True) -> Optional[str]:
+        """
+        Make sure the municipality's code is indexed, fetching it at most once.
+        Returns the municipality key, or None if the code is not available.
+        """
+        key = municipality_key(muni_info)
+        if not key or not url:
+            return None
+        if self.has(key):
+            return key
+        if not allow_fetch or key in self._failed:
+            return None
+        try:
+            text = _fetch_code_text(url)
+        except Exception as e:
+            self._failed[key] = str(e)
+            return None
+        self.add_document(muni_info or {}, url, text)
+        return key
+
+    def search(self, key: str, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Full-text search within one municipality's code. Returns heading + snippet, best match first."""
+        try:
+            rows = self.conn.execute(
+                "SELECT heading, snippet(sections, 2, '[', ']', ' … ', 24) "
+                "FROM sections WHERE sections MATCH ? AND muni_key = ? ORDER BY rank LIMIT ?",
+                (query, key, limit),
+            ).fetchall()
+        except sqlite3.OperationalError:
+            # malformed FTS query
+            return []
+        return [{"heading": h, "snippet": s} for h, s in rows]
+
+    def solar_provisions(self, key: str, limit: int = 3) -> Dict[str, List[Dict[str, Any]]]:
+        """Run every SOLAR_TOPICS query for a municipality."""
+        return {topic: self.search(key, q, limit) for topic, q in SOLAR_TOPICS.items()}
+
+    def close(self) -> None:
+        with self._conns_lock:
+            conns, self._conns = self._conns, []
+        for _, conn in conns:
+            conn.close()
+        self._local = threading.local()
+
+
+def _default_db_path() -> str:
+    return os.path.join(load_settings().cache_dir, "zoning_codes.sqlite")
+
+
+_STORES: Dict[str, ZoningCodeStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_store(db_path: Optional[str] = None) -> ZoningCodeStore:
+    """Return a process-wide store for db_path (default: <settings.cache_dir>/zoning_codes.sqlite)."""
+    path = db_path or _default_db_path()
+    with _STORES_LOCK:
+        if path not in _STORES:
+            _STORES[path] = ZoningCodeStore(path)
+        return _STORES[path]